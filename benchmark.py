@@ -0,0 +1,176 @@
+#benchmark.py
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from track_library import TrackLibrary
+
+# Synthetic libraries for timing the hot paths; see README for usage.
+HERE = os.path.dirname(os.path.abspath(__file__))
+WORDS = ("love night day heart fire rain dream home road light wall alive hell shape "
+         "river summer stone blue gold wild ghost paper city radio").split()
+QUERIES = ["love", "ni", "heart of", "artist 12", "zzz"]
+
+def generate_library(folder, size, media=1000, seed=1):
+    # tracks.csv with `size` rows, and covers and audio for the first `media` tracks.
+    # Media files are hard links to one sample each, so big libraries cost no disk.
+    rng = random.Random(seed)
+    artists = [f"Artist {i}" for i in range(max(size // 20, 1))]
+    with open(os.path.join(folder, "tracks.csv"), mode="w", encoding="utf-8", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["track_id", "name", "artist", "rating", "plays", "album", "year"])
+        for i in range(1, size + 1):
+            name = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 4))).title()
+            album, year = ("", "") if rng.random() < 0.3 else (rng.choice(WORDS).title(), rng.randint(1960, 2024))
+            writer.writerow([str(i).zfill(2), name, rng.choice(artists), rng.randint(0, 5),
+                             rng.randint(0, 500), album, year])
+
+    for subfolder, sample, extension in (("track_images", "01.jpg", ".jpg"), ("track_sounds", "01.mp3", ".mp3")):
+        target = os.path.join(folder, subfolder)
+        os.makedirs(target, exist_ok=True)
+        source = os.path.join(HERE, subfolder, sample)
+        if not os.path.exists(source):
+            continue
+        template = os.path.join(target, "sample" + extension)
+        shutil.copyfile(source, template)
+        for i in range(1, min(media, size) + 1):
+            _link(template, os.path.join(target, str(i).zfill(2) + extension))
+    fallback = os.path.join(HERE, "track_images", "no_image.jpg")
+    if os.path.exists(fallback):
+        shutil.copyfile(fallback, os.path.join(folder, "track_images", "no_image.jpg"))
+
+def _link(source, target):
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
+
+def best_of(repeat, fn):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def per_call(calls, fn):
+    # Mean seconds per call over `calls` calls; fn gets the call number
+    start = time.perf_counter()
+    for i in range(calls):
+        fn(i)
+    return (time.perf_counter() - start) / calls
+
+def bench_scale(size, args):
+    results = {}
+    open_library = lambda **kwargs: TrackLibrary("tracks.csv", "track_images", "track_sounds", **kwargs)
+
+    lib = open_library(use_snapshot=False)
+    keys = lib.get_keys()
+    results["load"] = best_of(args.repeat, lib.load_library_from_csv)
+    results["load_lazy"] = best_of(args.repeat, open_library(lazy_load=True, use_snapshot=False).load_library_from_csv)
+    results["save"] = best_of(args.repeat, lib.save_library_to_csv)
+    snapshotted = open_library()
+    snapshotted.save_library_to_csv()  # writes tracks.csv.snap as well
+    results["load_snapshot"] = best_of(args.repeat, snapshotted.load_library_from_csv)
+
+    # A full rewrite per play is what the plain CSV mode does, so it gets fewer calls
+    results["increment_play_count"] = per_call(min(args.ops, 20), lambda i: lib.increment_play_count(keys[i]))
+    journaled = open_library(use_journal=True)
+    results["increment_play_count_journal"] = per_call(args.ops, lambda i: journaled.increment_play_count(keys[i % size]))
+    journaled.close()
+    lib.load_library_from_csv()  # fold the journal back in
+    buffered = open_library(write_behind=True, flush_threshold=args.ops + 1)
+    results["increment_play_count_write_behind"] = per_call(args.ops, lambda i: buffered.increment_play_count(keys[i % size]))
+    results["write_behind_flush"] = best_of(1, buffered.flush)
+    buffered.close()
+
+    lib = open_library()
+    results["search_index_build"] = best_of(1, lambda: lib.search(QUERIES[0]))
+    results["search"] = per_call(len(QUERIES), lambda i: lib.search(QUERIES[i]))
+    results["filter_index_build"] = best_of(1, lambda: lib.find_by_rating(5))
+    results["filter_artist"] = per_call(10, lambda i: lib.find_by_artist(f"artist {i}"))
+    results["filter_rating"] = per_call(6, lambda i: lib.find_by_rating(i))
+    results["filter_play_range"] = per_call(10, lambda i: lib.find_by_play_range(i * 50, i * 50 + 25))
+    results["render"] = bench_render(lib, keys, args.repeat)
+    lib.close()
+    return results
+
+def bench_render(lib, keys, repeat):
+    # display_tracks_by_keys in a withdrawn window; needs a display and PIL
+    try:
+        import tkinter as tk
+        from view_tracks_tab import ViewTracksTab
+        root = tk.Tk()
+    except Exception as e:
+        return {"skipped": f"{type(e).__name__}: {e}"}
+    try:
+        root.withdraw()
+        root.geometry("1200x800")
+        tab = ViewTracksTab(root, lib)
+        tab.pack(fill="both", expand=True)
+        root.update()
+
+        def render():
+            tab.display_tracks_by_keys(keys)
+            root.update_idletasks()
+        seconds = best_of(repeat, render)
+        tab.destroy()
+        return seconds
+    finally:
+        root.destroy()
+
+def compare(previous, current):
+    # Ratio previous/current per metric: above 1 means this run is faster
+    for size, results in current["results"].items():
+        before = previous.get("results", {}).get(size, {})
+        for metric, seconds in results.items():
+            old = before.get(metric)
+            if isinstance(seconds, float) and isinstance(old, float) and seconds:
+                print(f"{size:>9} {metric:<36} {old / seconds:6.2f}x")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time library operations on synthetic libraries.")
+    parser.add_argument("--sizes", default="1000,100000,1000000", help="comma-separated track counts")
+    parser.add_argument("--media", type=int, default=1000, help="tracks that get cover and audio files")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per timing, best is kept")
+    parser.add_argument("--ops", type=int, default=1000, help="calls per per-operation timing")
+    parser.add_argument("--output", default="bench_results.json", help="JSON results file")
+    parser.add_argument("--compare", metavar="JSON", help="earlier results to compare against")
+    args = parser.parse_args(argv)
+
+    report = {
+        "started": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "unit": "seconds",
+        "results": {},
+    }
+    cwd = os.getcwd()
+    for size in (int(value) for value in args.sizes.split(",")):
+        folder = tempfile.mkdtemp(prefix=f"jukebox_bench_{size}_")
+        try:
+            generate_library(folder, size, args.media)
+            os.chdir(folder)  # the tabs use the default relative media folders
+            report["results"][str(size)] = bench_scale(size, args)
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(folder, ignore_errors=True)
+        for metric, seconds in report["results"][str(size)].items():
+            print(f"{size:>9} {metric:<36} {seconds if not isinstance(seconds, float) else f'{seconds * 1000:.3f} ms'}")
+
+    with open(args.output, mode="w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            compare(json.load(file), report)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
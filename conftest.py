@@ -0,0 +1,30 @@
+import os
+import pytest
+from track_library import TrackLibrary
+
+# The library most tests start from. A test module can set EXTRA_ROWS to CSV lines
+# that the csv_path fixture appends after these.
+CSV_TEXT = (
+    "track_id,name,artist,rating,plays,album,year\n"
+    "01,Numb,Linkin Park,5,10,Meteora,2003\n"
+    "02,Imagine,John Lennon,4,3,,\n"
+)
+
+@pytest.fixture
+def csv_text(request):
+    # What csv_path holds: CSV_TEXT and the module's EXTRA_ROWS
+    return CSV_TEXT + getattr(request.module, "EXTRA_ROWS", "")
+
+@pytest.fixture
+def csv_path(tmp_path, csv_text):
+    path = tmp_path / "tracks.csv"
+    path.write_text(csv_text, encoding="utf-8")
+    return str(path)
+
+@pytest.fixture
+def open_library():
+    # open_library(path, **kwargs) -> TrackLibrary, with covers and audio next to the CSV
+    def open_(path, **kwargs):
+        folder = os.path.dirname(path)
+        return TrackLibrary(path, img_folder=folder, sound_folder=folder, **kwargs)
+    return open_
@@ -1,22 +1,25 @@
 #create_track_list_tab.py
 import tkinter as tk
 from tkinter import ttk, filedialog
+import queue
 from PIL import Image, ImageTk
-import pygame
-import os
-import threading
-import time
+from playlist import Playlist, PlaylistStore
+from track_library import ChangeTracker
+import metrics
 
 class CreateTrackListTab(ttk.Frame):
     def __init__(self, master, lib):
         super().__init__(master)
         self.lib = lib
-        self.playlist = []
+        self.store = PlaylistStore()   # named playlists in playlists/, each read when first loaded
+        self.playlist = Playlist("playlist")
         self.is_playing = False
         self.is_paused = False
         self.current_track_index = 0
+        self.changes = ChangeTracker(lib)
+        self.engine = None             # pygame is imported and set up on the first play
+        self.play_session = 0          # events from an earlier play_playlist() are ignored
 
-        pygame.mixer.init()
         self._load_icons()
         self.build_create_tab()
 
@@ -53,8 +56,19 @@ class CreateTrackListTab(ttk.Frame):
         self.play_button.grid(row=0, column=3, padx=10)
         self.pause_button = tk.Button(btn_frame, text=" Pause", image=self.icons.get('pause'), compound="left",bg="#f5f5dc" ,command=self.pause_audio)
         self.pause_button.grid(row=0, column=4, padx=10)
-        tk.Button(btn_frame, text=" Save", image=self.icons.get('save'), compound="left",bg="#bbdefb" ,command=self.save_playlist).grid(row=0, column=5, padx=10)
-        tk.Button(btn_frame, text=" Load", image=self.icons.get('load'), compound="left",bg="#e1bee7" ,command=self.load_playlist).grid(row=0, column=6, padx=10)
+        tk.Button(btn_frame, text="Up", command=lambda: self.move_selected(-1)).grid(row=0, column=5, padx=(10, 2))
+        tk.Button(btn_frame, text="Down", command=lambda: self.move_selected(1)).grid(row=0, column=6, padx=(2, 10))
+
+        # Named playlists: type a new name to save under it, or pick one to load
+        name_frame = tk.Frame(self)
+        name_frame.grid(row=4, column=0, columnspan=2, pady=5)
+        tk.Label(name_frame, text="Playlist name:").grid(row=0, column=0, padx=5)
+        self.playlist_name = ttk.Combobox(name_frame, width=25, values=self.store.names())
+        self.playlist_name.set(self.playlist.name)
+        self.playlist_name.grid(row=0, column=1, padx=5)
+        tk.Button(name_frame, text=" Save", image=self.icons.get('save'), compound="left",bg="#bbdefb" ,command=self.save_playlist).grid(row=0, column=2, padx=10)
+        tk.Button(name_frame, text=" Load", image=self.icons.get('load'), compound="left",bg="#e1bee7" ,command=self.load_playlist).grid(row=0, column=3, padx=10)
+        tk.Button(name_frame, text="Delete", command=self.delete_playlist).grid(row=0, column=4, padx=10)
     def create_add(self):
         raw = self.create_entry.get().strip()
         if not raw:
@@ -66,12 +80,11 @@ class CreateTrackListTab(ttk.Frame):
         invalid = []
 
         for key in input_keys:
-            if not key.isdigit() or self.lib.get_name(key) is None:
+            if not key.isdigit() or not self.lib.has_track(key):
                 invalid.append(key)
-            elif key not in self.playlist and key not in new_keys:
+            elif self.playlist.add(key):   # False for ids already in the playlist
                 new_keys.append(key)
 
-        self.playlist.extend(new_keys)
         self.refresh_listbox()
 
         if invalid:
@@ -81,26 +94,25 @@ class CreateTrackListTab(ttk.Frame):
         else:
             self.create_status.config(text="Tracks added.")
 
-        pygame.mixer.music.stop()
-        self.is_playing = False
-        self.is_paused = False
+        self.stop_playback()
         self.current_track_index = 0
         self.play_button.config(state=tk.NORMAL)
     def refresh_listbox(self):
-        self.create_listbox.delete(0, tk.END)
-        for key in self.playlist:
-            name = self.lib.get_name(key)
-            artist = self.lib.get_artist(key)
-            rating = "*" * self.lib.get_rating(key)
-            plays = self.lib.get_play_count(key)
-            self.create_listbox.insert(tk.END, f"{key}: {name} - {artist} | Rating: {rating} | Plays: {plays}")
+        with metrics.timer("playlist.render"):
+            self.create_listbox.delete(0, tk.END)
+            for key in self.playlist:
+                self.create_listbox.insert(tk.END, self.listbox_text(key))
+    def listbox_text(self, key):
+        name = self.lib.get_name(key)
+        artist = self.lib.get_artist(key)
+        rating = "*" * self.lib.get_rating(key)
+        plays = self.lib.get_play_count(key)
+        return f"{key}: {name} - {artist} | Rating: {rating} | Plays: {plays}"
     def create_reset(self):
         self.playlist.clear()
         self.create_listbox.delete(0, tk.END)
         self.create_status.config(text="Playlist reset.")
-        pygame.mixer.music.stop()
-        self.is_playing = False
-        self.is_paused = False
+        self.stop_playback()
         self.current_track_index = 0
         self.play_button.config(state=tk.NORMAL)
         self.pause_button.config(text="Pause")
@@ -117,16 +129,13 @@ class CreateTrackListTab(ttk.Frame):
         for key in input_keys:
             if not key.isdigit():
                 invalid.append(key)
-            elif key in self.playlist and key not in removed:
-                self.playlist.remove(key)
+            elif self.playlist.remove(key):
                 removed.append(key)
-            elif key not in self.playlist:
+            else:
                 invalid.append(key)
 
         self.refresh_listbox()
-        self.is_playing = False
-        self.is_paused = False
-        pygame.mixer.music.stop()
+        self.stop_playback()
         self.play_button.config(state=tk.NORMAL)
         self.pause_button.config(text="Pause")
 
@@ -136,12 +145,6 @@ class CreateTrackListTab(ttk.Frame):
             self.create_status.config(text=f"Removed: {', '.join(removed)}")
         elif invalid:
             self.create_status.config(text=f"No valid tracks found. Invalid: {', '.join(invalid)}")
-    def monitor_playback(self):
-        while pygame.mixer.music.get_busy():
-            time.sleep(0.1)
-        if not self.is_paused:
-            self.current_track_index += 1
-            self.play_next_track()
     def play_playlist(self):
         if not self.playlist:
             self.create_status.config(text="No tracks in playlist.")
@@ -149,7 +152,7 @@ class CreateTrackListTab(ttk.Frame):
             return
 
         if self.is_paused:
-            pygame.mixer.music.unpause()
+            self.engine.resume()
             self.create_status.config(text="Playback resumed.")
             self.is_paused = False
             return
@@ -159,73 +162,145 @@ class CreateTrackListTab(ttk.Frame):
 
         self.play_button.config(state=tk.DISABLED)
         self.current_track_index = 0
-        self.play_next_track()
-    def play_next_track(self):
-        if self.current_track_index >= len(self.playlist):
+        if self.engine is None:
+            from playback_engine import PlaybackEngine
+            self.engine = PlaybackEngine(notify=self.wake_for_playback_events)
+            self.bind("<<PlaybackEvents>>", lambda event: self.drain_playback_events())
+        self.play_session += 1
+        self.is_playing = True
+        self.is_paused = False
+        self.engine.play(self.playlist, 0, self.play_session)
+    def stop_playback(self):
+        if self.is_playing:
+            self.engine.stop()
+        self.is_playing = False
+        self.is_paused = False
+    def wake_for_playback_events(self):
+        # Runs on the engine thread: Tk queues the virtual event for its own thread
+        try:
+            self.event_generate("<<PlaybackEvents>>", when="tail")
+        except (tk.TclError, RuntimeError):
+            pass  # the window is closing
+    def drain_playback_events(self):
+        # The engine thread never touches widgets; its events are handled here, on the Tk thread
+        while True:
+            try:
+                event = self.engine.events.get_nowait()
+            except queue.Empty:
+                break
+            if event.session == self.play_session:
+                self.handle_playback_event(event)
+    def handle_playback_event(self, event):
+        self.current_track_index = event.index
+        if event.kind == "started":
+            metrics.count("playback.tracks_started")
+            if event.detail is not None:
+                metrics.observe("playback.start_delay", event.detail)
+            self.pause_button.config(text="Pause")
+            self.lib.increment_play_count(event.key)
+            self.refresh()
+            self.create_status.config(text=f"Now playing: {event.key}")
+        elif event.kind == "skipped":
+            self.create_status.config(text=f"Skipped: {event.key} ({event.detail})")
+        elif event.kind == "error":
+            self.create_status.config(text=f"Error playing track {event.key}")
+            print("Audio error:", event.detail)
+        elif event.kind == "finished":
             self.create_status.config(text="All tracks played.")
             self.is_playing = False
             self.play_button.config(state=tk.NORMAL)
-            return
-
-        key = self.playlist[self.current_track_index]
-        audio_path = f"track_sounds/{key}.mp3"
-
-        if os.path.exists(audio_path):
-            try:
-                pygame.mixer.music.load(audio_path)
-                pygame.mixer.music.play()
-                self.pause_button.config(text="Pause")
-                self.lib.increment_play_count(key)
-                self.refresh_listbox()
-                self.create_status.config(text=f"Now playing: {key}")
-                self.is_playing = True
-                self.is_paused = False
-                threading.Thread(target=self.monitor_playback, daemon=True).start()
-            except Exception as e:
-                self.create_status.config(text=f"Error playing track {key}")
-                print("Audio error:", e)
-                self.current_track_index += 1
-                self.play_next_track()
-        else:
-            self.create_status.config(text=f"Skipped: {key} (no audio)")
-            self.current_track_index += 1
-            self.play_next_track()
     def pause_audio(self):
         if self.is_playing and not self.is_paused:
-            pygame.mixer.music.pause()
+            self.engine.pause()
             self.create_status.config(text="Paused.")
             self.is_paused = True
             self.pause_button.config(text="Resume")
         elif self.is_playing and self.is_paused:
-            pygame.mixer.music.unpause()
+            self.engine.resume()
             self.create_status.config(text="Resumed.")
             self.is_paused = False
             self.pause_button.config(text="Pause")
             self.play_button.config(state=tk.DISABLED)
+    def move_selected(self, step):
+        # Moves the selected tracks one place up (step -1) or down (step 1)
+        selected = [self.playlist[index] for index in self.create_listbox.curselection()]
+        if not selected:
+            self.create_status.config(text="Select tracks to move.")
+            return
+        blocked = set()                # selected tracks already at the top or bottom stay put
+        for key in (selected if step < 0 else reversed(selected)):
+            neighbour = self.playlist.before(key) if step < 0 else self.playlist.after(key)
+            if neighbour is None or neighbour in blocked:
+                blocked.add(key)
+            elif step < 0:
+                self.playlist.move_up(key)
+            else:
+                self.playlist.move_down(key)
+        self.refresh_listbox()
+        positions = {key: index for index, key in enumerate(self.playlist)}
+        for key in selected:
+            self.create_listbox.selection_set(positions[key])
+        self.stop_playback()
+        self.play_button.config(state=tk.NORMAL)
     def save_playlist(self):
+        name = self.playlist_name.get().strip()
+        if not name:
+            self.create_status.config(text="Enter a playlist name.")
+            return
         if not self.playlist:
             self.create_status.config(text="No tracks to save.")
             return
 
         try:
-            with open("playlist.csv", "w") as f:
-                for track_id in self.playlist:
-                    f.write(track_id + "\n")
-            self.create_status.config(text="Playlist saved.")
+            self.playlist.name = name
+            self.store.save(self.playlist)
+            self.playlist_name.config(values=self.store.names())
+            self.create_status.config(text=f"Playlist '{name}' saved.")
         except Exception as e:
             print("Save error:", e)
             self.create_status.config(text="Error saving playlist.")
     def load_playlist(self):
+        name = self.playlist_name.get().strip()
+        if name not in self.store:
+            self.create_status.config(text=f"No playlist named '{name}'.")
+            return
+
         try:
-            with open("playlist.csv", "r") as f:
-                lines = f.readlines()
-                self.playlist = [line.strip().zfill(2) for line in lines if self.lib.get_name(line.strip().zfill(2))]
+            stored = self.store.get(name)
+            # A working copy, without tracks deleted from the library since it was saved
+            self.playlist = Playlist(name, (key for key in stored if self.lib.has_track(key)))
+            self.stop_playback()
+            self.current_track_index = 0
+            self.play_button.config(state=tk.NORMAL)
             self.refresh_listbox()
-            self.create_status.config(text="Playlist loaded.")
-        except FileNotFoundError:
-            self.create_status.config(text="playlist.csv not found.")
+            self.create_status.config(text=f"Playlist '{name}' loaded.")
         except Exception as e:
             print("Load error:", e)
             self.create_status.config(text="Error loading playlist.")
+    def delete_playlist(self):
+        name = self.playlist_name.get().strip()
+        if self.store.delete(name):
+            self.playlist_name.config(values=self.store.names())
+            self.create_status.config(text=f"Playlist '{name}' deleted.")
+        else:
+            self.create_status.config(text=f"No playlist named '{name}'.")
     def refresh(self):
-        self.refresh_listbox()
\ No newline at end of file
+        if not self.changes.changed():
+            return
+        updated, structural, reloaded = self.changes.take()
+        if reloaded or structural:
+            self.refresh_listbox()
+            return
+
+        # Rewrite only the lines of tracks that changed
+        for index, key in enumerate(self.playlist):
+            if key in updated:
+                selected = self.create_listbox.selection_includes(index)
+                self.create_listbox.delete(index)
+                self.create_listbox.insert(index, self.listbox_text(key))
+                if selected:
+                    self.create_listbox.selection_set(index)
+    def destroy(self):
+        if self.engine is not None:
+            self.engine.shutdown()
+        super().destroy()
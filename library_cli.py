@@ -0,0 +1,215 @@
+#library_cli.py
+import argparse
+import csv
+import json
+import sys
+from collections import Counter
+from itertools import islice
+import metrics
+from process_lock import ProcessLock
+from track_library import TrackLibrary
+from track_query import (SORT_FIELDS, Album, All, Artist, Plays, Query, Rating, Text, Year, parse_range,
+                         select_sorted, sort_value)
+from track_storage import FIELDNAMES, SqliteTrackStorage
+
+# Headless entry point (python -m track_library): nothing here imports Tk, PIL or pygame
+
+def open_library(args):
+    # Each run does one thing: reads skip write-behind and only --days opens the play
+    # history. Reads scan the rows once (see scan) instead of building the GUI's indexes.
+    storage = SqliteTrackStorage(args.sqlite, import_csv=args.csv) if args.sqlite else None
+    return TrackLibrary(args.csv, args.images, args.sounds, use_journal=True, write_behind=args.writes,
+                        storage=storage, lazy_load=True, play_history=bool(getattr(args, "days", None)))
+
+class RowWriter:
+    # Writes rows to out as they come, in tsv, csv or json (one object per line)
+    def __init__(self, out, fmt):
+        self.out = out
+        self.fmt = fmt
+        self._csv = csv.writer(out, lineterminator="\n") if fmt == "csv" else None
+        if self._csv is not None:
+            self._csv.writerow(FIELDNAMES)
+
+    def write(self, row):
+        if self.fmt == "json":
+            self.out.write(json.dumps(row) + "\n")
+            return
+        values = ["" if row[field] is None else row[field] for field in FIELDNAMES]
+        if self._csv is not None:
+            self._csv.writerow(values)
+        else:
+            self.out.write("\t".join(str(value) for value in values) + "\n")
+
+def range_arg(text):
+    # argparse type for --rating/--plays/--year, so a bad range is a usage error
+    try:
+        return parse_range(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected N, N-M or N+, not {text!r}")
+
+def scan(lib, query):
+    # Rows matching a track_query.Query in one pass over the library, sorted and
+    # paged like QueryEngine would. Unsorted rows stream to the caller as they are
+    # read; only a sort has to collect them.
+    rows = (row for row in lib.iter_rows() if query.where is None or query.where.matches(row))
+    stop = None if query.limit is None else query.offset + query.limit
+    if query.sort is None:
+        return islice(rows, query.offset, stop)
+    pairs = ((row, sort_value(query.sort, row[query.sort])) for row in rows)
+    return select_sorted(pairs, query.descending, stop)[query.offset:]
+
+def write_rows(rows, args):
+    writer = RowWriter(sys.stdout, args.format)
+    for row in rows:
+        writer.write(row)
+
+def cmd_search(lib, args):
+    write_rows(scan(lib, Query(Text(args.query))), args)
+
+def cmd_filter(lib, args):
+    # Every option given must match; ranges are written 10, 10-20 or 10+
+    conditions = []
+    if args.artist is not None:
+        conditions.append(Artist(args.artist))
+    if args.album is not None:
+        conditions.append(Album(args.album))
+    if args.rating is not None:
+        low, high = args.rating
+        conditions.append(Rating(low, 5 if high is None else high))
+    if args.plays is not None:
+        conditions.append(Plays(*args.plays))
+    if args.year is not None:
+        low, high = args.year
+        conditions.append(Year(low, 9999 if high is None else high))
+    where = All(*conditions) if conditions else None
+    write_rows(scan(lib, Query(where, args.sort, args.descending, args.limit)), args)
+
+def cmd_stats(lib, args):
+    tracks = plays = 0
+    counts = Counter()
+    for row in lib.iter_rows():
+        tracks += 1
+        plays += row["plays"]
+        counts[row["artist"]] += 1
+    print(f"tracks\t{tracks}")
+    print(f"artists\t{len(counts)}")
+    print(f"plays\t{plays}")
+    for artist, count in sorted(counts.items(), key=lambda pair: (-pair[1], pair[0]))[:args.top]:
+        print(f"artist\t{artist}\t{count}")
+    if args.days:
+        # From the play history's daily buckets, not the lifetime counts
+        for key, plays in lib.top_recent(args.days, args.top):
+            print(f"recent\t{key}\t{lib.get_name(key)}\t{plays}")
+
+def cmd_rate(lib, args):
+    # Pairs come from the command line as ID=RATING, or one "ID RATING" per line on stdin
+    pairs = [pair.split("=", 1) for pair in args.pairs]
+    if not pairs:
+        pairs = (line.replace("=", " ").split() for line in sys.stdin if line.strip())
+    failed = 0
+    for pair in pairs:
+        track_id = pair[0].strip().zfill(2)
+        rating = pair[1].strip() if len(pair) == 2 else ""  # "2" or "01 3 x" are skipped too
+        if not lib.has_track(track_id) or not rating.isdigit() or int(rating) > 5:
+            print(f"{track_id}: skipped", file=sys.stderr)
+            failed += 1
+            continue
+        lib.set_rating(track_id, int(rating))
+    return 1 if failed else 0
+
+def cmd_import(lib, args):
+    from track_import import import_tracks, load_entries
+
+    def report(done, total):
+        print(f"\rCopying media: {done}/{total}", end="", file=sys.stderr, flush=True)
+
+    result = import_tracks(lib, load_entries(args.source), args.workers, report)
+    print(file=sys.stderr)
+    for track_id, message in result.errors:
+        print(f"{track_id}: {message}", file=sys.stderr)
+    print(f"Added {len(result.added)} tracks, skipped {len(result.skipped)} existing ids, "
+          f"{len(result.errors)} problems.")
+    return 1 if result.errors else 0
+
+def cmd_export(lib, args):
+    out = open(args.output, mode="w", encoding="utf-8", newline="") if args.output else sys.stdout
+    try:
+        writer = RowWriter(out, args.format)
+        for row in lib.iter_rows():
+            writer.write(row)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m track_library", description="Query and maintain the track library without the GUI.")
+    parser.add_argument("--csv", default="tracks.csv", help="library CSV (default: tracks.csv)")
+    parser.add_argument("--sqlite", metavar="DB", help="use a SQLite library instead")
+    parser.add_argument("--images", default="track_images", help="cover folder (default: track_images)")
+    parser.add_argument("--sounds", default="track_sounds", help="audio folder (default: track_sounds)")
+    parser.add_argument("--metrics", metavar="FILE", help="write timings to FILE on exit (.prom for Prometheus text)")
+    parser.set_defaults(writes=False)  # commands that change the library set writes=True
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def add_format(command, default="tsv"):
+        command.add_argument("--format", choices=["tsv", "csv", "json"], default=default)
+
+    search = commands.add_parser("search", help="tracks whose name or artist contains the text")
+    search.add_argument("query")
+    add_format(search)
+    search.set_defaults(run=cmd_search)
+
+    filter_ = commands.add_parser("filter", help="tracks matching every option given")
+    filter_.add_argument("--artist")
+    filter_.add_argument("--album")
+    filter_.add_argument("--rating", type=range_arg, help="4, 3-5 or 3+")
+    filter_.add_argument("--plays", type=range_arg, help="10, 10-20 or 10+")
+    filter_.add_argument("--year", type=range_arg, help="1999, 1990-1999 or 2000+")
+    filter_.add_argument("--sort", choices=SORT_FIELDS)
+    filter_.add_argument("--descending", action="store_true")
+    filter_.add_argument("--limit", type=int)
+    add_format(filter_)
+    filter_.set_defaults(run=cmd_filter)
+
+    stats = commands.add_parser("stats", help="track, artist and play totals")
+    stats.add_argument("--top", type=int, default=10, help="artists (and tracks with --days) to list (default: 10)")
+    stats.add_argument("--days", type=int, help="also list the most played tracks of the last DAYS days")
+    stats.set_defaults(run=cmd_stats)
+
+    rate = commands.add_parser("rate", help="set ratings: ID=RATING ..., or lines of 'ID RATING' on stdin")
+    rate.add_argument("pairs", nargs="*")
+    rate.set_defaults(run=cmd_rate, writes=True)
+
+    import_ = commands.add_parser("import", help="bulk import a folder or manifest CSV")
+    import_.add_argument("source")
+    import_.add_argument("--workers", type=int, default=8)
+    import_.set_defaults(run=cmd_import, writes=True)
+
+    export = commands.add_parser("export", help="write every track")
+    export.add_argument("-o", "--output", help="file to write (default: stdout)")
+    add_format(export, "csv")
+    export.set_defaults(run=cmd_export)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.metrics:
+        metrics.enable()
+    # Loading folds the journal into the CSV and the GUI rewrites the whole file, so
+    # the two must never have one library open at once
+    lock = ProcessLock(args.csv + ".lock")
+    if not lock.acquire():
+        print(f"{args.csv} is open in another process (is the GUI running?); close it and try again.", file=sys.stderr)
+        return 2
+    try:
+        lib = open_library(args)
+        try:
+            return args.run(lib, args) or 0
+        except BrokenPipeError:
+            return 0  # e.g. piped into head
+        finally:
+            lib.close()
+            if args.metrics:
+                metrics.write_snapshot(args.metrics)
+    finally:
+        lock.release()
@@ -0,0 +1,175 @@
+#library_index.py
+from bisect import bisect_left, bisect_right, insort
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+class _TrackIndex:
+    # Shared bookkeeping: the indexed fields of each track and its position in the
+    # library, so results come back in library order without walking the library.
+    def __init__(self):
+        self._docs = {}
+        self._order = {}
+        self._next_position = 0
+
+    def _place(self, key, doc):
+        # Returns False when nothing indexed changed; otherwise unlinks the old doc
+        if self._docs.get(key) == doc:
+            return False
+        if key in self._docs:
+            self._unlink(key)
+        else:
+            self._order[key] = self._next_position
+            self._next_position += 1
+        self._docs[key] = doc
+        return True
+    def remove(self, key):
+        if key in self._docs:
+            self._unlink(key)
+            del self._docs[key]
+            del self._order[key]
+    def _in_order(self, keys):
+        return sorted(keys, key=self._order.__getitem__)
+    @staticmethod
+    def _discard(postings, value, key):
+        keys = postings[value]
+        keys.discard(key)
+        if not keys:
+            del postings[value]
+
+class SearchIndex(_TrackIndex):
+    # Substring search over track names and artists. Queries of three or more
+    # characters intersect trigram posting lists; shorter ones scan the (much
+    # smaller) token vocabulary, since they can only match inside a single token.
+    def __init__(self):
+        super().__init__()
+        self._grams = {}       # trigram -> set of track_ids
+        self._tokens = {}      # whitespace-separated token -> set of track_ids
+
+    def add(self, key, name, artist):
+        doc = (name.lower(), artist.lower())
+        if not self._place(key, doc):
+            return
+        for gram in trigrams(doc[0]) | trigrams(doc[1]):
+            self._grams.setdefault(gram, set()).add(key)
+        for token in set(doc[0].split() + doc[1].split()):
+            self._tokens.setdefault(token, set()).add(key)
+
+    def search(self, query):
+        query = query.strip().lower()
+        if len(query) >= 3:
+            postings = sorted((self._grams.get(gram, ()) for gram in trigrams(query)), key=len)
+            candidates = set(postings[0]).intersection(*postings[1:])
+        else:
+            candidates = set()
+            for token, keys in self._tokens.items():
+                if query in token:
+                    candidates.update(keys)
+
+        return self._in_order(key for key in candidates
+                              if query in self._docs[key][0] or query in self._docs[key][1])
+
+    def _unlink(self, key):
+        name, artist = self._docs[key]
+        for gram in trigrams(name) | trigrams(artist):
+            self._discard(self._grams, gram, key)
+        for token in set(name.split() + artist.split()):
+            self._discard(self._tokens, token, key)
+
+class FieldIndexes(_TrackIndex):
+    # Secondary indexes for the filter controls: artist -> ids, rating buckets, a
+    # play-count ordered list for range queries and the sorted artist list with counts.
+    # The play and rating orderings also serve sorted and top-K views.
+    def __init__(self):
+        super().__init__()
+        self._by_artist = {}      # lower-cased artist -> set of track_ids
+        self._by_rating = {}      # rating -> set of track_ids
+        self._by_plays = []       # sorted (plays, position, track_id)
+        self._rating_order = []   # sorted (rating, position, track_id)
+        self._artist_counts = {}  # artist as written -> number of tracks
+        self._artists = []        # sorted keys of _artist_counts
+
+    def add(self, key, artist, rating, plays):
+        if not self._place(key, (artist, rating, plays)):
+            return
+        self._by_artist.setdefault(artist.lower(), set()).add(key)
+        self._by_rating.setdefault(rating, set()).add(key)
+        insort(self._by_plays, (plays, self._order[key], key))
+        insort(self._rating_order, (rating, self._order[key], key))
+        if artist not in self._artist_counts:
+            self._artist_counts[artist] = 0
+            insort(self._artists, artist)
+        self._artist_counts[artist] += 1
+    def add_all(self, rows):
+        # First build from (key, artist, rating, plays) rows. The orderings are sorted
+        # once at the end; insort per row would make the build quadratic.
+        if self._docs:
+            for row in rows:
+                self.add(*row)
+            return
+        by_plays, by_rating = [], []
+        for key, artist, rating, plays in rows:
+            position = self._next_position
+            self._next_position += 1
+            self._order[key] = position
+            self._docs[key] = (artist, rating, plays)
+            self._by_artist.setdefault(artist.lower(), set()).add(key)
+            self._by_rating.setdefault(rating, set()).add(key)
+            by_plays.append((plays, position, key))
+            by_rating.append((rating, position, key))
+            self._artist_counts[artist] = self._artist_counts.get(artist, 0) + 1
+        by_plays.sort()
+        by_rating.sort()
+        self._by_plays, self._rating_order = by_plays, by_rating
+        self._artists = sorted(self._artist_counts)
+
+    def find_by_artist(self, artist):
+        return self._in_order(self._by_artist.get(artist.lower(), ()))
+    def find_by_rating(self, rating):
+        return self._in_order(self._by_rating.get(rating, ()))
+    def find_by_play_range(self, low, high=None):
+        start = bisect_left(self._by_plays, (low,))
+        end = len(self._by_plays) if high is None else bisect_right(self._by_plays, (high, float("inf")))
+        return self._in_order(key for _, _, key in self._by_plays[start:end])
+    def keys_by_plays(self, descending=False, start=0, stop=None):
+        return self._ordered(self._by_plays, descending, start, stop)
+    def keys_by_rating(self, descending=False, start=0, stop=None):
+        return self._ordered(self._rating_order, descending, start, stop)
+    def get_artists(self):
+        return list(self._artists)
+    def artist_counts(self):
+        return [(artist, self._artist_counts[artist]) for artist in self._artists]
+    def play_buckets(self, count=4):
+        # Play-count ranges holding roughly equal numbers of tracks: "0-9", ..., "120+"
+        if not self._by_plays:
+            return []
+        size = len(self._by_plays)
+        bounds = sorted({0} | {self._by_plays[size * i // count][0] for i in range(1, count)})
+        labels = [f"{low}-{high - 1}" for low, high in zip(bounds, bounds[1:])]
+        return labels + [f"{bounds[-1]}+"]
+
+    @staticmethod
+    def _ordered(entries, descending, start, stop):
+        # Slice of an ordering, ties in library order both ways. Descending walks
+        # runs of equal values down from the top, so only the requested page is read.
+        stop = len(entries) if stop is None else min(stop, len(entries))
+        if not descending:
+            return [key for _, _, key in entries[start:stop]]
+        keys = []
+        end = len(entries)
+        while end > 0 and len(keys) < stop:
+            begin = bisect_left(entries, (entries[end - 1][0],))
+            keys.extend(key for _, _, key in entries[begin:end])
+            end = begin
+        return keys[start:stop]
+
+    def _unlink(self, key):
+        artist, rating, plays = self._docs[key]
+        self._discard(self._by_artist, artist.lower(), key)
+        self._discard(self._by_rating, rating, key)
+        del self._by_plays[bisect_left(self._by_plays, (plays, self._order[key], key))]
+        del self._rating_order[bisect_left(self._rating_order, (rating, self._order[key], key))]
+        self._artist_counts[artist] -= 1
+        if not self._artist_counts[artist]:
+            del self._artist_counts[artist]
+            del self._artists[bisect_left(self._artists, artist)]
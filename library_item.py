@@ -1,5 +1,7 @@
 #library_item.py
 class LibraryItem:
+    __slots__ = ("name", "artist", "rating", "play_count")
+
     def __init__(self, name, artist, rating=0):
         self.name = name
         self.artist = artist
@@ -10,12 +12,11 @@ class LibraryItem:
         return f"{self.name} - {self.artist} {self.stars()}"
 
     def stars(self):
-        stars = ""
-        for i in range(self.rating):
-            stars += "*"
-        return stars
+        return "*" * self.rating
 
 class LibraryItemAlbum(LibraryItem):
+    __slots__ = ("album", "year")
+
     def __init__(self, name, artist, rating=0, album="", year=None):
         super().__init__(name, artist, rating)
         self.album = album
@@ -0,0 +1,103 @@
+#media_store.py
+import hashlib
+import os
+import shutil
+import threading
+
+class MediaStore:
+    # Content-addressed media for one folder. Each distinct file is kept once as
+    # <folder>/.objects/<sha256><extension> and <folder>/<id><extension> is a hard
+    # link to it, so code that opens media by track id is unchanged. The link count
+    # is the reference count: an object with no other link left is deleted.
+    def __init__(self, folder, extension):
+        self.folder = folder
+        self.extension = extension
+        self.objects = os.path.join(folder, ".objects")
+        self._lock = threading.Lock()   # held from looking up an object to linking or deleting it
+        self._by_inode = None           # (device, inode) -> object path, from one scan of .objects
+
+    def path(self, key):
+        return os.path.join(self.folder, f"{key}{self.extension}")
+
+    def put(self, key, source):
+        # Store source as the media for key; a file already stored costs only the hash
+        digest = self._hash(source)
+        stored = os.path.join(self.objects, digest + self.extension)
+        copy = None
+        if not os.path.exists(stored):
+            # The copy is made outside the lock, only moved into place under it
+            os.makedirs(self.objects, exist_ok=True)
+            copy = f"{stored}.{key}.tmp"
+            shutil.copyfile(source, copy)
+
+        target = self.path(key)
+        link = target + ".tmp"
+        with self._lock:
+            if copy is not None:
+                os.replace(copy, stored)
+            elif not os.path.exists(stored):
+                shutil.copyfile(source, stored)  # its last link was removed since the check
+            self._remember(stored)
+            old = self._object_of(target)
+            try:
+                os.link(stored, link)
+                linked = True
+            except OSError:
+                shutil.copyfile(stored, link)  # no hard links on this file system
+                linked = False
+            os.replace(link, target)
+            if old is not None and old != stored:
+                self._collect(old)
+            if not linked:
+                self._collect(stored)
+        return digest
+    def remove(self, key):
+        target = self.path(key)
+        with self._lock:
+            old = self._object_of(target)
+            if os.path.exists(target):
+                os.remove(target)
+            if old is not None:
+                self._collect(old)
+
+    # --- Objects (call with the lock held) ---
+
+    def _object_of(self, path):
+        # The stored object that path links to, or None for a plain file
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        if stat.st_nlink < 2:
+            return None
+        inode = (stat.st_dev, stat.st_ino)
+        if self._by_inode is None or inode not in self._by_inode:
+            self._scan()  # first lookup, or an object stored by another process
+        return self._by_inode.get(inode)
+    def _scan(self):
+        self._by_inode = {}
+        if os.path.isdir(self.objects):
+            for entry in os.scandir(self.objects):
+                if entry.name.endswith(self.extension):  # not copies still being made
+                    stat = entry.stat()
+                    self._by_inode[(stat.st_dev, stat.st_ino)] = entry.path
+    def _remember(self, stored):
+        if self._by_inode is not None:
+            stat = os.stat(stored)
+            self._by_inode[(stat.st_dev, stat.st_ino)] = stored
+    def _collect(self, stored):
+        try:
+            stat = os.stat(stored)
+            if stat.st_nlink <= 1:
+                os.remove(stored)
+                if self._by_inode is not None:
+                    self._by_inode.pop((stat.st_dev, stat.st_ino), None)  # the inode may be reused
+        except FileNotFoundError:
+            pass
+    @staticmethod
+    def _hash(source):
+        digest = hashlib.sha256()
+        with open(source, mode="rb") as file:
+            for chunk in iter(lambda: file.read(1 << 20), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
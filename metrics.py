@@ -0,0 +1,125 @@
+#metrics.py
+import json
+import os
+import threading
+import time
+
+# Opt-in timers and counters for the hot paths. While disabled (the default),
+# timer() returns a shared do-nothing context manager and count()/observe()
+# return straight away, so instrumented code pays one global lookup.
+enabled = False
+_lock = threading.Lock()
+_counters = {}      # name -> count
+_timers = {}        # name -> [calls, total seconds, max seconds]
+
+def enable():
+    global enabled
+    enabled = True
+def disable():
+    global enabled
+    enabled = False
+def reset():
+    with _lock:
+        _counters.clear()
+        _timers.clear()
+
+def count(name, amount=1):
+    if not enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+def observe(name, seconds):
+    if not enabled:
+        return
+    with _lock:
+        stats = _timers.get(name)
+        if stats is None:
+            _timers[name] = [1, seconds, seconds]
+        else:
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+
+class _Timer:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.start)
+        return False
+
+class _NoTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+    def __exit__(self, *exc):
+        return False
+
+_NO_TIMER = _NoTimer()
+
+def timer(name):
+    # with metrics.timer("library.save"): ...
+    return _Timer(name) if enabled else _NO_TIMER
+
+# --- Export ---
+
+def snapshot():
+    with _lock:
+        return {
+            "time": time.time(),
+            "counters": dict(_counters),
+            "timers": {name: {"count": calls, "total": total, "mean": total / calls, "max": peak}
+                       for name, (calls, total, peak) in _timers.items()},
+        }
+def to_json(snap=None):
+    return json.dumps(snap or snapshot(), indent=2, sort_keys=True)
+def to_prometheus(snap=None):
+    snap = snap or snapshot()
+    lines = []
+    for name, value in sorted(snap["counters"].items()):
+        metric = _metric_name(name) + "_total"
+        lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+    for name, stats in sorted(snap["timers"].items()):
+        metric = _metric_name(name) + "_seconds"
+        lines += [f"# TYPE {metric} summary",
+                  f"{metric}_count {stats['count']}",
+                  f"{metric}_sum {stats['total']:.6f}",
+                  f"# TYPE {metric}_max gauge",
+                  f"{metric}_max {stats['max']:.6f}"]
+    return "\n".join(lines) + "\n"
+def _metric_name(name):
+    return "jukebox_" + "".join(char if char.isalnum() else "_" for char in name)
+
+def write_snapshot(path):
+    # Prometheus text for *.prom, JSON otherwise; replaced atomically so readers never see half a file
+    text = to_prometheus() if path.endswith(".prom") else to_json()
+    tmp_path = path + ".tmp"
+    with open(tmp_path, mode="w", encoding="utf-8") as file:
+        file.write(text)
+    os.replace(tmp_path, path)
+
+class SnapshotWriter:
+    # Enables metrics and rewrites path every `interval` seconds until stop()
+    def __init__(self, path, interval=10.0):
+        self.path = path
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        enable()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+        write_snapshot(self.path)
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            write_snapshot(self.path)
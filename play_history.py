@@ -0,0 +1,160 @@
+#play_history.py
+import json
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from track_storage import replace_file, sync_file
+
+class PlayHistory:
+    # When each track was played. record() only updates counters and queues the
+    # event, so playback never waits for the disk; a writer thread appends events to
+    # `path` ("seq<TAB>time<TAB>track_id" lines). Plays are also counted per hour and
+    # per local day, and the "last N days" queries read those buckets.
+    #
+    # Compaction (every compact_every events, and on close) saves the buckets with the
+    # last sequence number they include to <path>.buckets, drops hourly buckets older
+    # than keep_hours, daily ones older than keep_days and raw events older than
+    # keep_raw_days. On load, logged events after that sequence number are replayed.
+    def __init__(self, path="tracks.csv.plays", keep_hours=48, keep_days=400, keep_raw_days=30,
+                 compact_every=1000):
+        self.path = path
+        self.buckets_file = path + ".buckets"
+        self.keep_hours = keep_hours
+        self.keep_days = keep_days
+        self.keep_raw_days = keep_raw_days
+        self.compact_every = compact_every
+        self._lock = threading.Lock()
+        self._hours = {}           # hours since the epoch -> Counter(track_id -> plays)
+        self._days = {}            # local date ordinal -> Counter(track_id -> plays)
+        self._seq = 0              # sequence number of the last recorded event
+        self._since_compact = 0
+        self._load()
+
+        self._events = queue.SimpleQueue()
+        self._log = None
+        self._writer = threading.Thread(target=self._run, name="play-history", daemon=True)
+        self._writer.start()
+
+    def record(self, key, when=None):
+        when = time.time() if when is None else when
+        with self._lock:
+            self._seq += 1
+            self._count(key, when)
+            self._events.put((self._seq, when, key))
+    def close(self):
+        self._events.put(None)
+        self._writer.join()
+
+    # --- Queries ---
+
+    def plays_in_last_days(self, days, now=None):
+        # Counter of plays per track over today and the days - 1 days before it
+        today = _day(time.time() if now is None else now)
+        with self._lock:
+            buckets = [self._days[day] for day in range(today - days + 1, today + 1) if day in self._days]
+        return sum(buckets, Counter())
+    def plays_in_last_hours(self, hours, now=None):
+        # Counter of plays per track over this hour and the hours - 1 before it (up to keep_hours)
+        current = _hour(time.time() if now is None else now)
+        with self._lock:
+            buckets = [self._hours[hour] for hour in range(current - hours + 1, current + 1) if hour in self._hours]
+        return sum(buckets, Counter())
+    def top(self, days, count=10, now=None):
+        # [(track_id, plays)] of the most played tracks in the last `days` days
+        return self.plays_in_last_days(days, now).most_common(count)
+
+    # --- Buckets ---
+
+    def _count(self, key, when):
+        self._hours.setdefault(_hour(when), Counter())[key] += 1
+        self._days.setdefault(_day(when), Counter())[key] += 1
+    def _expire(self, now):
+        oldest_hour = _hour(now) - self.keep_hours
+        oldest_day = _day(now) - self.keep_days
+        for hour in [hour for hour in self._hours if hour <= oldest_hour]:
+            del self._hours[hour]
+        for day in [day for day in self._days if day <= oldest_day]:
+            del self._days[day]
+
+    # --- Files ---
+
+    def _load(self):
+        folded = 0
+        if os.path.exists(self.buckets_file):
+            with open(self.buckets_file, mode="r", encoding="utf-8") as file:
+                state = json.load(file)
+            folded = state["seq"]
+            self._hours = {int(hour): Counter(plays) for hour, plays in state["hours"].items()}
+            self._days = {int(day): Counter(plays) for day, plays in state["days"].items()}
+        self._seq = folded
+        for seq, when, key in self._read_log():
+            if seq > folded:
+                self._count(key, when)
+            self._seq = max(self._seq, seq)
+        self._expire(time.time())
+    def _read_log(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, mode="r", encoding="utf-8") as file:
+            for line in file:
+                try:
+                    seq, when, key = line.rstrip("\n").split("\t")
+                    yield int(seq), float(when), key
+                except ValueError:
+                    continue  # skip a line torn by a crash mid-append
+
+    def _run(self):
+        # The only thread that touches the files after __init__
+        while True:
+            batch = [self._events.get()]
+            while not self._events.empty():
+                batch.append(self._events.get())
+            closing = batch[-1] is None
+            events = [event for event in batch if event is not None]
+            try:
+                if events:
+                    if self._log is None:
+                        self._log = open(self.path, mode="a", encoding="utf-8")
+                    self._log.writelines(f"{seq}\t{when:.3f}\t{key}\n" for seq, when, key in events)
+                    self._log.flush()
+                    self._since_compact += len(events)
+                if self._since_compact and (closing or self._since_compact >= self.compact_every):
+                    self._compact()
+            except OSError as e:
+                print(f"Play history write failed: {e}")  # the counts in memory are still right
+            if closing:
+                if self._log is not None:
+                    self._log.close()
+                return
+    def _compact(self):
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            # Queued events are in the buckets too: their seq is covered, so replay skips them
+            state = {"seq": self._seq,
+                     "hours": {hour: dict(plays) for hour, plays in self._hours.items()},
+                     "days": {day: dict(plays) for day, plays in self._days.items()}}
+        self._write(self.buckets_file, [json.dumps(state)])
+
+        # Buckets are saved first, so a crash before the log is rewritten only keeps old lines
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        oldest = now - self.keep_raw_days * 86400
+        self._write(self.path, [f"{seq}\t{when:.3f}\t{key}\n" for seq, when, key in self._read_log() if when >= oldest])
+        self._since_compact = 0
+    @staticmethod
+    def _write(path, lines):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, mode="w", encoding="utf-8") as file:
+            file.writelines(lines)
+            sync_file(file)
+        replace_file(tmp_path, path)
+
+def _hour(when):
+    return int(when // 3600)
+def _day(when):
+    return datetime.fromtimestamp(when).toordinal()
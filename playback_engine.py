@@ -0,0 +1,196 @@
+#playback_engine.py
+import os
+import queue
+import threading
+import time
+from collections import namedtuple
+import pygame
+
+# kind is "started", "skipped", "error", "finished" or "stopped"; detail is the reason
+# for skipped/error and, for started, the start delay in seconds (see start_delay_stats)
+PlaybackEvent = namedtuple("PlaybackEvent", ["kind", "session", "index", "key", "detail"])
+
+class PlaybackEngine:
+    # Owns pygame.mixer on one long-lived thread. Only the mixer is initialised: no
+    # SDL display or event queue, which must live on the main thread (Tk's) on macOS.
+    # The GUI sends commands with play(), pause(), resume() and stop(); the engine
+    # puts PlaybackEvents on `events` and calls notify() (for the GUI, a Tk virtual
+    # event) so they are handled on the GUI's own thread without polling.
+    # While a track plays the thread sleeps on the command queue for at most POLL
+    # seconds, then looks at the mixer. The next playable entry is handed to
+    # pygame.mixer.music.queue() so SDL starts it the moment the current one ends;
+    # the engine sees the switch as the mixer position starting over.
+    POLL = 0.2
+
+    def __init__(self, sound_folder="track_sounds", notify=None):
+        self.sound_folder = sound_folder
+        self.notify = notify
+        self.events = queue.Queue()
+        self._commands = queue.Queue()
+        self._thread = None
+        self._session = None
+        self._playlist = []
+        self._index = 0
+        self._playing = False
+        self._paused = False
+        self._queued = None            # (playlist index, deferred events) handed to music.queue()
+        self._position = 0             # mixer position at the last look, in ms
+        self.delay_count = 0
+        self.delay_total = 0.0
+        self.delay_max = 0.0
+
+    def start(self):
+        if self._thread is None:
+            ready = threading.Event()
+            self._thread = threading.Thread(target=self._run, args=(ready,), name="playback", daemon=True)
+            self._thread.start()
+            ready.wait()
+
+    def play(self, playlist, index=0, session=None):
+        self._send("play", list(playlist), index, session)
+    def pause(self):
+        self._send("pause")
+    def resume(self):
+        self._send("resume")
+    def stop(self):
+        self._send("stop")
+    def shutdown(self):
+        if self._thread is not None:
+            self._send("quit")
+            self._thread.join(timeout=1)
+            self._thread = None
+    def start_delay_stats(self):
+        # Seconds from a track ending to the "started" event of the next one: how late
+        # the GUI hears of a track change. It is not the silence between the tracks,
+        # which the mixer does not report (a queued track has none; SDL switches at once).
+        mean = self.delay_total / self.delay_count if self.delay_count else 0.0
+        return {"count": self.delay_count, "mean": mean, "max": self.delay_max}
+
+    def _send(self, *command):
+        self.start()
+        self._commands.put(command)
+
+    # --- Engine thread ---
+
+    def _run(self, ready):
+        pygame.mixer.init()
+        ready.set()
+
+        while True:
+            try:
+                command = self._commands.get(timeout=self.POLL if self._playing and not self._paused else None)
+            except queue.Empty:
+                command = None
+            while command is not None:
+                if command[0] == "quit":
+                    pygame.mixer.music.stop()
+                    return
+                self._handle(command)
+                try:
+                    command = self._commands.get_nowait()
+                except queue.Empty:
+                    command = None
+
+            if self._playing and not self._paused:
+                self._check_mixer()
+    def _check_mixer(self):
+        now = time.perf_counter()
+        position = pygame.mixer.music.get_pos()
+        if not pygame.mixer.music.get_busy():
+            # Ended with nothing queued (or the queued file would not start)
+            self._queued = None
+            self._index += 1
+            self._play_current(now)
+        elif self._queued is not None and 0 <= position < self._position:
+            # SDL has switched to the queued track; it has played `position` ms since
+            self._advance(now - position / 1000)
+        else:
+            self._position = position
+    def _handle(self, command):
+        kind = command[0]
+        if kind == "play":
+            self._halt()
+            _, self._playlist, self._index, self._session = command
+            self._playing = True
+            self._paused = False
+            self._play_current()
+        elif kind == "pause" and self._playing and not self._paused:
+            pygame.mixer.music.pause()
+            self._paused = True
+        elif kind == "resume" and self._paused:
+            pygame.mixer.music.unpause()
+            self._paused = False
+        elif kind == "stop":
+            self._halt()
+            self._playing = False
+            self._paused = False
+            self._emit("stopped")
+    def _halt(self):
+        self._queued = None
+        pygame.mixer.music.stop()      # also drops anything queued
+    def _advance(self, ended_at):
+        # pygame already started the queued track when the previous one ended
+        (self._index, deferred), self._queued = self._queued, None
+        for event in deferred:
+            self._emit_at(*event)
+        self._started(ended_at)
+    def _play_current(self, ended_at=None):
+        while True:
+            found = self._find_playable(self._index, self._emit_at)
+            if found is None:
+                self._playing = False
+                self._emit("finished")
+                return
+            self._index, path = found
+            try:
+                pygame.mixer.music.load(path)
+                pygame.mixer.music.play()
+            except pygame.error as e:
+                self._emit("error", self._playlist[self._index], str(e))
+                self._index += 1
+                continue
+            self._started(ended_at)
+            return
+    def _started(self, ended_at):
+        delay = None
+        if ended_at is not None:
+            delay = time.perf_counter() - ended_at
+            self.delay_count += 1
+            self.delay_total += delay
+            self.delay_max = max(self.delay_max, delay)
+        self._position = 0
+        self._emit("started", self._playlist[self._index], delay)
+        self._prefetch()
+    def _prefetch(self):
+        # Skips found now are reported when the queued track actually starts
+        deferred = []
+        index = self._index + 1
+        while True:
+            found = self._find_playable(index, lambda *event: deferred.append(event))
+            if found is None:
+                return
+            index, path = found
+            try:
+                pygame.mixer.music.queue(path)
+            except pygame.error as e:
+                deferred.append(("error", index, self._playlist[index], str(e)))
+                index += 1
+                continue
+            self._queued = (index, deferred)
+            return
+    def _find_playable(self, index, report):
+        # First entry from index on that has an audio file, as (index, path)
+        while index < len(self._playlist):
+            key = self._playlist[index]
+            path = os.path.join(self.sound_folder, f"{key}.mp3")
+            if os.path.exists(path):
+                return index, path
+            report("skipped", index, key, "no audio")
+            index += 1
+        return None
+    def _emit_at(self, kind, index, key, detail):
+        self.events.put(PlaybackEvent(kind, self._session, index, key, detail))
+        if self.notify is not None:
+            self.notify()
+    def _emit(self, kind, key=None, detail=None):
+        self._emit_at(kind, self._index, key, detail)
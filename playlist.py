@@ -0,0 +1,167 @@
+#playlist.py
+import json
+import os
+import re
+from track_storage import replace_file, sync_file
+
+class Playlist:
+    # Ordered set of track ids. Each id links to its neighbours through a dict, so
+    # membership, adding, removing and moving an id are O(1) at any position.
+    # Indexing goes through a list of the ids that is rebuilt after a change.
+    def __init__(self, name, keys=()):
+        self.name = name
+        self._links = {}      # track_id -> [previous track_id, next track_id]
+        self._first = None
+        self._last = None
+        self._order = None    # cached list(self), None after a change
+        self.extend(keys)
+
+    def __contains__(self, key):
+        return key in self._links
+    def __len__(self):
+        return len(self._links)
+    def __iter__(self):
+        key = self._first
+        while key is not None:
+            yield key
+            key = self._links[key][1]
+    def __getitem__(self, index):
+        if self._order is None:
+            self._order = list(self)
+        return self._order[index]
+    def keys(self):
+        return self[:]
+
+    def add(self, key, before=None):
+        # Appends key, or puts it in front of `before`; False if already present
+        if key in self._links:
+            return False
+        self._link(key, before)
+        return True
+    def extend(self, keys):
+        return [key for key in keys if self.add(key)]
+    def remove(self, key):
+        if key not in self._links:
+            return False
+        self._unlink(key)
+        del self._links[key]
+        return True
+    def move(self, key, before=None):
+        # Moves key in front of `before`, or to the end
+        if key == before:
+            return
+        self._unlink(key)
+        self._link(key, before)
+    def move_up(self, key):
+        previous = self.before(key)
+        if previous is not None:
+            self.move(key, previous)
+    def move_down(self, key):
+        following = self.after(key)
+        if following is not None:
+            self.move(following, key)
+    def before(self, key):
+        return self._links[key][0]
+    def after(self, key):
+        return self._links[key][1]
+    def clear(self):
+        self._links.clear()
+        self._first = self._last = None
+        self._order = None
+
+    def _link(self, key, before):
+        if before is None:
+            previous, following = self._last, None
+        else:
+            previous, following = self._links[before][0], before
+        self._links[key] = [previous, following]
+        if previous is None:
+            self._first = key
+        else:
+            self._links[previous][1] = key
+        if following is None:
+            self._last = key
+        else:
+            self._links[following][0] = key
+        self._order = None
+    def _unlink(self, key):
+        previous, following = self._links[key]
+        if previous is None:
+            self._first = following
+        else:
+            self._links[previous][1] = following
+        if following is None:
+            self._last = previous
+        else:
+            self._links[following][0] = previous
+        self._order = None
+
+class PlaylistStore:
+    # Named playlists, one file of track ids each, in `folder`. index.json maps names
+    # to files and track counts, so listing playlists reads no playlist file; each
+    # one is read the first time it is asked for and kept after that.
+    def __init__(self, folder="playlists", legacy_file="playlist.csv"):
+        self.folder = folder
+        self.index_file = os.path.join(folder, "index.json")
+        self._index = {}      # name -> {"file": file name in folder, "tracks": count}
+        self._loaded = {}     # name -> Playlist
+        if os.path.exists(self.index_file):
+            with open(self.index_file, mode="r", encoding="utf-8") as file:
+                self._index = json.load(file)
+        elif legacy_file and os.path.exists(legacy_file):
+            # The single playlist.csv of earlier versions becomes the playlist "playlist"
+            with open(legacy_file, mode="r", encoding="utf-8") as file:
+                keys = [line.strip().zfill(2) for line in file if line.strip()]
+            self.save(Playlist("playlist", keys))
+
+    def names(self):
+        return list(self._index)
+    def __contains__(self, name):
+        return name in self._index
+    def track_count(self, name):
+        return self._index[name]["tracks"]
+    def get(self, name):
+        playlist = self._loaded.get(name)
+        if playlist is None:
+            with open(os.path.join(self.folder, self._index[name]["file"]), mode="r", encoding="utf-8") as file:
+                playlist = Playlist(name, (line.strip() for line in file if line.strip()))
+            self._loaded[name] = playlist
+        return playlist
+    def save(self, playlist):
+        os.makedirs(self.folder, exist_ok=True)
+        entry = self._index.get(playlist.name) or {"file": self._file_name(playlist.name)}
+        self._write(entry["file"], "".join(key + "\n" for key in playlist))
+        entry["tracks"] = len(playlist)
+        self._index[playlist.name] = entry
+        self._loaded[playlist.name] = Playlist(playlist.name, playlist)  # later edits stay unsaved
+        self._write_index()
+    def delete(self, name):
+        entry = self._index.pop(name, None)
+        if entry is None:
+            return False
+        self._loaded.pop(name, None)
+        self._write_index()
+        try:
+            os.remove(os.path.join(self.folder, entry["file"]))
+        except FileNotFoundError:
+            pass
+        return True
+
+    def _file_name(self, name):
+        # Readable and unique: "Road Trip" -> road_trip.txt, then road_trip_2.txt, ...
+        stem = re.sub(r"[^a-z0-9]+", "_", name.lower()).strip("_") or "playlist"
+        taken = {entry["file"] for entry in self._index.values()}
+        file_name, number = stem + ".txt", 1
+        while file_name in taken or os.path.exists(os.path.join(self.folder, file_name)):
+            number += 1
+            file_name = f"{stem}_{number}.txt"
+        return file_name
+    def _write_index(self):
+        self._write("index.json", json.dumps(self._index, indent=2))
+    def _write(self, file_name, text):
+        path = os.path.join(self.folder, file_name)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, mode="w", encoding="utf-8") as file:
+            file.write(text)
+            sync_file(file)
+        replace_file(tmp_path, path)
@@ -0,0 +1,42 @@
+#process_lock.py
+import os
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+class ProcessLock:
+    # Exclusive lock on a file, so only one process at a time works on a library.
+    # The OS drops the lock when the holder exits, so a crash never leaves it stuck.
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def acquire(self):
+        # False when another process holds the lock
+        file = open(self.path, mode="a+", encoding="utf-8")
+        try:
+            if fcntl is not None:
+                fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                file.seek(0)
+                msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            file.close()
+            return False
+        file.truncate(0)
+        file.write(f"{os.getpid()}\n")  # who holds it, for people looking at the file
+        file.flush()
+        self._file = file
+        return True
+    def release(self):
+        if self._file is None:
+            return
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        else:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        self._file.close()
+        self._file = None
@@ -0,0 +1,83 @@
+#save_worker.py
+import threading
+import time
+from collections import namedtuple
+import metrics
+
+# error is None when the job succeeded; pending is True while more work is queued
+SaveEvent = namedtuple("SaveEvent", ["job", "error", "seconds", "pending"])
+
+class SaveWorker:
+    # One background thread that runs save jobs (e.g. TrackLibrary.flush) in order.
+    # A job that is already queued is not queued twice: every job reads the library
+    # when it runs, so one run writes the latest state for any number of requests.
+    # Listeners get a SaveEvent on the worker thread after each run.
+    def __init__(self, name="save-worker"):
+        self._condition = threading.Condition()
+        self._pending = {}          # job -> None, in submit order
+        self._running = None
+        self._closed = False
+        self._listeners = []
+        self.runs = 0
+        self.collapsed = 0
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, job):
+        with self._condition:
+            if self._closed:
+                return False
+            if job in self._pending:
+                self.collapsed += 1
+                metrics.count("save.collapsed")
+            else:
+                self._pending[job] = None
+                self._condition.notify_all()
+            return True
+    def busy(self):
+        with self._condition:
+            return bool(self._pending) or self._running is not None
+    def wait(self, timeout=None):
+        # True once nothing is queued or running
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._pending and self._running is None, timeout)
+    def close(self, timeout=None):
+        # Runs what is still queued, then stops the thread
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    def subscribe(self, callback):
+        self._listeners.append(callback)
+    def unsubscribe(self, callback):
+        self._listeners.remove(callback)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending or self._closed)
+                if not self._pending:
+                    return
+                job = next(iter(self._pending))
+                del self._pending[job]
+                self._running = job
+
+            start = time.perf_counter()
+            error = None
+            try:
+                job()
+            except Exception as e:
+                error = e  # reported to listeners; the next submit tries again
+            seconds = time.perf_counter() - start
+            metrics.observe("save.run", seconds)
+
+            with self._condition:
+                self._running = None
+                self.runs += 1
+                pending = bool(self._pending)
+                self._condition.notify_all()
+            event = SaveEvent(job, error, seconds, pending)
+            for callback in list(self._listeners):
+                callback(event)
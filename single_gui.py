@@ -1,46 +1,143 @@
 #single_gui.py
+import time
+STARTED = time.perf_counter()  # before any other import, for --startup-time
+
+import importlib
+import queue
+import sys
+import threading
 import tkinter as tk
 from tkinter import ttk
 from font_manager import FontManager
-from view_tracks_tab import ViewTracksTab
-from create_track_list_tab import CreateTrackListTab
-from update_tracks_tab import UpdateTracksTab
+import metrics
+from process_lock import ProcessLock
 from track_library import TrackLibrary
+from track_storage import SqliteTrackStorage
+
+# Tab modules pull in PIL and pygame, so each is imported when its tab is first shown
+TABS = [
+    ("👀 View Tracks", "view_tracks_tab", "ViewTracksTab"),
+    ("🎵 Create Playlist", "create_track_list_tab", "CreateTrackListTab"),
+    ("✏️ Update Tracks", "update_tracks_tab", "UpdateTracksTab"),
+]
 
-lib = TrackLibrary()
+def open_library():
+    # "--sqlite" keeps the library in tracks.db (seeded from tracks.csv on first run)
+    storage = SqliteTrackStorage("tracks.db", import_csv="tracks.csv") if "--sqlite" in sys.argv else None
+    return TrackLibrary(use_journal=True, write_behind=True, storage=storage, lazy_load=True, play_history=True)
 
 class JukeBoxApp(tk.Tk):
-    def __init__(self):
+    def __init__(self, measure_startup=False):
         super().__init__()
         FontManager().configure()
         self.title("JukeBox App")
         self.state('zoomed')
         self.resizable(True, True)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        self.lib = None
+        self.lock = ProcessLock("tracks.csv.lock")   # held while the window is open, see library_cli
+        self.pages = {}                 # notebook page name -> [module, class, built tab or None]
+        self.measure_startup = measure_startup
+        self.timings = {}
+
+        # The library loads on a worker thread while this label is shown
+        self.loading_label = tk.Label(self, text="Loading library...")
+        self.loading_label.pack(expand=True)
+        self.loaded = queue.Queue()
+        threading.Thread(target=self.load_library, daemon=True).start()
+        self.after(20, self.check_loaded)
+        self.after_idle(self.mark, "window")
 
-        # Notebook for tabs
-        notebook = ttk.Notebook(self)
-        notebook.pack(expand=True, fill="both")
-        notebook.bind("<<NotebookTabChanged>>",self.on_tab_change)
+    def load_library(self):
+        if not self.lock.acquire():
+            self.loaded.put(RuntimeError("it is open in another process (python -m track_library?)"))
+            return
+        try:
+            self.loaded.put(open_library())
+        except Exception as e:
+            self.loaded.put(e)
+    def check_loaded(self):
+        try:
+            result = self.loaded.get_nowait()
+        except queue.Empty:
+            self.after(20, self.check_loaded)
+            return
+        if isinstance(result, Exception):
+            self.loading_label.config(text=f"Could not load the library: {result}")
+            return
 
-        # View Tracks Tab
-        self.view_tab = ViewTracksTab(notebook, lib)
-        notebook.add(self.view_tab, text="👀 View Tracks")
+        self.lib = result
+        self.mark("library")
+        self.loading_label.destroy()
 
-        # Create Playlist Tab
-        self.create_tab = CreateTrackListTab(notebook, lib)
-        notebook.add(self.create_tab, text="🎵 Create Playlist")
+        # Saves run on the library's worker thread; their results come back through a queue
+        self.status_label = tk.Label(self, text="", anchor="w")
+        self.status_label.pack(side="bottom", fill="x", padx=10)
+        self.saves = queue.Queue()
+        self.lib.subscribe_saves(self.saves.put)
+        self.after(250, self.check_saves)
 
-        # Update Tracks Tab
-        self.update_tab = UpdateTracksTab(notebook, lib)
-        notebook.add(self.update_tab, text="✏️ Update Tracks")
+        # Notebook for tabs; each page stays empty until it is first selected
+        self.notebook = ttk.Notebook(self)
+        self.notebook.pack(expand=True, fill="both")
+        for text, module, cls in TABS:
+            page = ttk.Frame(self.notebook)
+            self.notebook.add(page, text=text)
+            self.pages[str(page)] = [module, cls, None]
+        self.show_tab(self.notebook.select())
+        self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_change)
+        self.mark("first tab")
 
+    def check_saves(self):
+        event = None
+        while not self.saves.empty():
+            event = self.saves.get_nowait()    # only the latest result is worth showing
+        if event is not None and event.error is not None:
+            self.status_label.config(text=f"Could not save the library: {event.error}", fg="red")
+        elif event is not None and not event.pending:
+            self.status_label.config(text=f"All changes saved at {time.strftime('%H:%M:%S')}", fg="black")
+        elif self.lib.saving():
+            self.status_label.config(text="Saving...", fg="black")
+        self.after(250, self.check_saves)
+
+    def show_tab(self, name):
+        page = self.pages[name]
+        if page[2] is None:
+            tab_class = getattr(importlib.import_module(page[0]), page[1])
+            page[2] = tab_class(self.nametowidget(name), self.lib)
+            page[2].pack(expand=True, fill="both")
+        elif hasattr(page[2], "refresh"):
+            page[2].refresh()
     def on_tab_change(self, event):
-        selected_tab = event.widget.select()
-        selected_frame = event.widget.nametowidget(selected_tab)
-        if hasattr(selected_frame, "refresh"):
-            selected_frame.refresh()
+        self.show_tab(event.widget.select())
+
+    def mark(self, milestone):
+        # --startup-time: seconds from process start until each milestone has been drawn
+        if not self.measure_startup:
+            return
+        self.update_idletasks()
+        self.timings[milestone] = time.perf_counter() - STARTED
+        if milestone == "first tab":
+            for name, seconds in self.timings.items():
+                print(f"{name}: {seconds * 1000:.0f} ms")
+            self.after_idle(self.on_close)
+
+    def on_close(self):
+        if self.lib is not None:
+            self.lib.close()
+        self.lock.release()
+        self.destroy()
 
 
 if __name__ == "__main__":
-    app = JukeBoxApp()
-    app.mainloop()
\ No newline at end of file
+    # "--metrics FILE" records timers and counters and rewrites FILE every 10 s
+    # (Prometheus text if it ends in .prom, JSON otherwise)
+    writer = None
+    if "--metrics" in sys.argv[:-1]:
+        writer = metrics.SnapshotWriter(sys.argv[sys.argv.index("--metrics") + 1])
+        writer.start()
+    app = JukeBoxApp(measure_startup="--startup-time" in sys.argv)
+    app.mainloop()
+    if writer is not None:
+        writer.stop()
@@ -0,0 +1,11 @@
+import json
+from benchmark import main
+
+def test_benchmark_writes_results(tmp_path, capsys):
+    output = tmp_path / "results.json"
+    assert main(["--sizes", "50", "--media", "5", "--repeat", "1", "--ops", "10", "--output", str(output)]) == 0
+
+    results = json.loads(output.read_text(encoding="utf-8"))["results"]["50"]
+    for metric in ("load", "load_snapshot", "save", "increment_play_count", "search", "filter_play_range"):
+        assert isinstance(results[metric], float)
+    assert "render" in results
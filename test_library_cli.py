@@ -0,0 +1,90 @@
+import io
+import json
+import subprocess
+import sys
+import pytest
+from library_cli import main, scan
+from process_lock import ProcessLock
+from track_library import TrackLibrary
+from track_query import Query, Text
+
+EXTRA_ROWS = "03,In the End,Linkin Park,3,25,,\n"
+
+def run(csv_path, *argv):
+    return main(["--csv", csv_path, "--images", "unused", "--sounds", "unused", *argv])
+
+def test_search_and_filter(csv_path, capsys):
+    run(csv_path, "search", "linkin")
+    assert [line.split("\t")[0] for line in capsys.readouterr().out.splitlines()] == ["01", "03"]
+
+    run(csv_path, "filter", "--plays", "5-30", "--format", "json")
+    rows = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [(row["track_id"], row["plays"]) for row in rows] == [("01", 10), ("03", 25)]
+
+    run(csv_path, "filter", "--artist", "linkin park", "--sort", "plays", "--descending", "--limit", "1")
+    assert [line.split("\t")[0] for line in capsys.readouterr().out.splitlines()] == ["03"]
+
+def test_unsorted_scan_streams(csv_path):
+    lib = TrackLibrary(csv_path, lazy_load=True)
+    rows = scan(lib, Query(Text("linkin")))
+    assert not isinstance(rows, list)
+    assert next(rows)["track_id"] == "01"
+    assert [row["track_id"] for row in rows] == ["03"]
+
+def test_stats(csv_path, capsys):
+    run(csv_path, "stats", "--top", "1")
+    assert capsys.readouterr().out.splitlines() == [
+        "tracks\t3", "artists\t2", "plays\t38", "artist\tLinkin Park\t2"]
+
+def test_stats_recent_plays(csv_path, capsys):
+    lib = TrackLibrary(csv_path, play_history=True)
+    for key in ("03", "01", "03"):
+        lib.increment_play_count(key)
+    lib.close()
+
+    run(csv_path, "stats", "--top", "1", "--days", "7")
+    assert capsys.readouterr().out.splitlines()[-1] == "recent\t03\tIn the End\t2"
+
+def test_rate_persists(csv_path, capsys):
+    assert run(csv_path, "rate", "2=1", "3=9") == 1
+    assert "03: skipped" in capsys.readouterr().err
+    lib = TrackLibrary(csv_path, use_journal=True)
+    assert lib.get_rating("02") == 1
+    assert lib.get_rating("03") == 3
+
+def test_rate_skips_malformed_pairs(csv_path, capsys, monkeypatch):
+    assert run(csv_path, "rate", "2", "1=2") == 1
+    assert "02: skipped" in capsys.readouterr().err
+
+    monkeypatch.setattr(sys, "stdin", io.StringIO("01 3 x\n02 5\n"))
+    assert run(csv_path, "rate") == 1
+    assert "01: skipped" in capsys.readouterr().err
+    lib = TrackLibrary(csv_path, use_journal=True)
+    assert [lib.get_rating(key) for key in ("01", "02")] == [2, 5]
+
+def test_bad_range_is_a_usage_error(csv_path, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        run(csv_path, "filter", "--rating", "abc")
+    assert exit_info.value.code == 2
+    assert "expected N, N-M or N+" in capsys.readouterr().err
+
+def test_export_csv(csv_path, tmp_path, csv_text):
+    out = tmp_path / "export.csv"
+    run(csv_path, "export", "-o", str(out))
+    assert out.read_text(encoding="utf-8") == csv_text
+
+def test_no_gui_modules_imported(csv_path):
+    code = ("import sys, library_cli; library_cli.main(['--csv', sys.argv[1], 'stats']); "
+            "print(sorted({'tkinter', 'PIL', 'pygame'} & set(sys.modules)))")
+    result = subprocess.run([sys.executable, "-c", code, csv_path], capture_output=True, text=True, check=True)
+    assert result.stdout.splitlines()[-1] == "[]"
+
+def test_refuses_a_library_open_elsewhere(csv_path, capsys):
+    lock = ProcessLock(csv_path + ".lock")
+    assert lock.acquire()
+    try:
+        assert run(csv_path, "stats") == 2
+        assert "open in another process" in capsys.readouterr().err
+    finally:
+        lock.release()
+    assert run(csv_path, "stats") == 0
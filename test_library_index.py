@@ -0,0 +1,65 @@
+from library_index import FieldIndexes, SearchIndex
+
+def make_index():
+    index = SearchIndex()
+    index.add("01", "Another Brick in the Wall", "Pink Floyd")
+    index.add("02", "Stayin' Alive", "Bee Gees")
+    index.add("03", "Highway to Hell", "AC/DC")
+    return index
+
+def test_search_substrings():
+    index = make_index()
+    assert index.search("BRICK") == ["01"]
+    assert index.search("ick in t") == ["01"]
+    assert index.search("ee") == ["02"]
+    assert index.search("/") == ["03"]
+    assert index.search("a") == ["01", "02", "03"]
+    assert index.search("zzz") == []
+
+def test_search_follows_updates():
+    index = make_index()
+    index.add("02", "Night Fever", "Bee Gees")
+    index.remove("03")
+    index.add("04", "Hells Bells", "AC/DC")
+
+    assert index.search("alive") == []
+    assert index.search("fever") == ["02"]
+    assert index.search("hell") == ["04"]
+    assert index.search("e") == ["01", "02", "04"]
+
+def make_fields():
+    fields = FieldIndexes()
+    fields.add("01", "Pink Floyd", 4, 69)
+    fields.add("02", "Bee Gees", 1, 38)
+    fields.add("03", "AC/DC", 2, 77)
+    fields.add("04", "Pink Floyd", 5, 12)
+    return fields
+
+def test_field_lookups():
+    fields = make_fields()
+    assert fields.find_by_artist("pink floyd") == ["01", "04"]
+    assert fields.find_by_rating(1) == ["02"]
+    assert fields.find_by_play_range(12, 69) == ["01", "02", "04"]
+    assert fields.find_by_play_range(51) == ["01", "03"]
+    assert fields.artist_counts() == [("AC/DC", 1), ("Bee Gees", 1), ("Pink Floyd", 2)]
+
+def test_field_indexes_follow_updates():
+    fields = make_fields()
+    fields.add("02", "Bee Gees", 1, 60)
+    fields.add("04", "Roger Waters", 5, 12)
+    fields.remove("03")
+
+    assert fields.find_by_play_range(51) == ["01", "02"]
+    assert fields.find_by_artist("Pink Floyd") == ["01"]
+    assert fields.get_artists() == ["Bee Gees", "Pink Floyd", "Roger Waters"]
+
+def test_bulk_build_matches_incremental():
+    rows = [("01", "Pink Floyd", 4, 69), ("02", "Bee Gees", 1, 38), ("03", "AC/DC", 2, 77), ("04", "Pink Floyd", 5, 12)]
+    bulk = FieldIndexes()
+    bulk.add_all(rows)
+    incremental = make_fields()
+    for name in ("_docs", "_order", "_by_artist", "_by_rating", "_by_plays", "_rating_order", "_artist_counts", "_artists"):
+        assert getattr(bulk, name) == getattr(incremental, name)
+
+    bulk.add("02", "Bee Gees", 1, 60)   # incremental changes keep working on a bulk build
+    assert bulk.find_by_play_range(51) == ["01", "02", "03"]
@@ -0,0 +1,85 @@
+import os
+import threading
+from media_store import MediaStore
+
+def make_source(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+def test_same_file_is_stored_once(tmp_path):
+    store = MediaStore(str(tmp_path / "sounds"), ".mp3")
+    os.makedirs(store.folder)
+    song = make_source(tmp_path, "song.mp3", b"audio")
+    store.put("01", song)
+    store.put("02", make_source(tmp_path, "copy.mp3", b"audio"))
+
+    assert os.listdir(store.objects) == [store._hash(song) + ".mp3"]
+    assert os.path.samefile(store.path("01"), store.path("02"))
+    assert open(store.path("02"), "rb").read() == b"audio"
+
+def test_object_removed_with_last_reference(tmp_path):
+    store = MediaStore(str(tmp_path / "sounds"), ".mp3")
+    os.makedirs(store.folder)
+    song = make_source(tmp_path, "song.mp3", b"audio")
+    store.put("01", song)
+    store.put("02", song)
+
+    store.remove("01")
+    assert not os.path.exists(store.path("01"))
+    assert len(os.listdir(store.objects)) == 1
+    store.remove("02")
+    assert os.listdir(store.objects) == []
+
+def test_replacing_media_releases_old_object(tmp_path):
+    store = MediaStore(str(tmp_path / "images"), ".jpg")
+    os.makedirs(store.folder)
+    store.put("01", make_source(tmp_path, "old.jpg", b"old"))
+    new = make_source(tmp_path, "new.jpg", b"new")
+    store.put("01", new)
+
+    assert os.listdir(store.objects) == [store._hash(new) + ".jpg"]
+    assert open(store.path("01"), "rb").read() == b"new"
+
+def test_plain_files_are_still_removed(tmp_path):
+    store = MediaStore(str(tmp_path), ".jpg")
+    (tmp_path / "05.jpg").write_bytes(b"legacy")
+    store.remove("05")
+    assert not os.path.exists(store.path("05"))
+
+def test_objects_are_scanned_once(tmp_path):
+    store = MediaStore(str(tmp_path / "sounds"), ".mp3")
+    os.makedirs(store.folder)
+    for key in ("01", "02", "03"):
+        store.put(key, make_source(tmp_path, f"{key}.mp3", key.encode()))
+    scans = []
+    scan = store._scan
+    store._scan = lambda: (scans.append(1), scan())
+
+    store.put("01", make_source(tmp_path, "new.mp3", b"new"))
+    store.remove("02")
+    store.remove("03")
+    assert len(scans) <= 1
+    assert sorted(os.listdir(store.objects)) == [store._hash(str(tmp_path / "new.mp3")) + ".mp3"]
+
+def test_put_and_remove_of_shared_object_race(tmp_path):
+    store = MediaStore(str(tmp_path / "sounds"), ".mp3")
+    os.makedirs(store.folder)
+    song = make_source(tmp_path, "song.mp3", b"audio")
+    errors = []
+
+    def churn(key):
+        try:
+            for _ in range(2000):
+                store.put(key, song)
+                store.remove(key)
+        except OSError as e:
+            errors.append(e)
+    workers = [threading.Thread(target=churn, args=(key,)) for key in ("01", "02", "03")]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert errors == []
+    assert os.listdir(store.objects) == []
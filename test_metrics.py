@@ -0,0 +1,46 @@
+import json
+import pytest
+import metrics
+from track_library import TrackLibrary
+
+@pytest.fixture
+def recording():
+    metrics.reset()
+    metrics.enable()
+    yield
+    metrics.disable()
+    metrics.reset()
+
+def test_disabled_records_nothing():
+    metrics.reset()
+    with metrics.timer("x"):
+        metrics.count("y")
+    assert metrics.snapshot()["counters"] == {}
+    assert metrics.snapshot()["timers"] == {}
+
+def test_timers_and_counters(recording):
+    for seconds in (0.5, 1.5):
+        metrics.observe("library.save", seconds)
+    metrics.count("library.mutations", 3)
+
+    snap = metrics.snapshot()
+    assert snap["counters"] == {"library.mutations": 3}
+    assert snap["timers"]["library.save"] == {"count": 2, "total": 2.0, "mean": 1.0, "max": 1.5}
+    text = metrics.to_prometheus(snap)
+    assert "jukebox_library_mutations_total 3" in text
+    assert "jukebox_library_save_seconds_count 2" in text
+    assert "jukebox_library_save_seconds_max 1.500000" in text
+
+def test_library_is_instrumented(recording, tmp_path):
+    path = tmp_path / "tracks.csv"
+    path.write_text("track_id,name,artist,rating,plays,album,year\n01,Numb,Linkin Park,5,10,,\n", encoding="utf-8")
+    lib = TrackLibrary(str(path), img_folder=str(tmp_path), sound_folder=str(tmp_path))
+    lib.increment_play_count("01")
+    lib.search("numb")
+    lib.find_by_rating(5)
+
+    out = tmp_path / "metrics.json"
+    metrics.write_snapshot(str(out))
+    snap = json.loads(out.read_text(encoding="utf-8"))
+    assert snap["counters"]["library.mutations"] == 1
+    assert set(snap["timers"]) >= {"library.load", "library.search", "library.filter"}
@@ -0,0 +1,45 @@
+import os
+import time
+from play_history import PlayHistory
+
+DAY = 86400
+
+def test_days_and_hours(tmp_path):
+    history = PlayHistory(str(tmp_path / "plays"))
+    now = time.time()
+    history.record("01", now)
+    history.record("01", now - 2 * 3600)
+    history.record("02", now - 3 * DAY)
+    history.record("03", now - 10 * DAY)
+
+    assert history.plays_in_last_hours(1, now) == {"01": 1}
+    assert history.plays_in_last_days(7, now) == {"01": 2, "02": 1}
+    assert history.top(30, 1, now) == [("01", 2)]
+    assert dict(history.top(30, 3, now)) == {"01": 2, "02": 1, "03": 1}
+    history.close()
+
+def test_reload_and_compaction(tmp_path):
+    path = str(tmp_path / "plays")
+    history = PlayHistory(path, keep_raw_days=5, compact_every=2)
+    now = time.time()
+    history.record("01", now - 10 * DAY)   # kept in the day buckets, dropped from the raw log
+    history.record("02", now)
+    history.record("02", now)              # logged after the compaction
+    history.close()
+
+    with open(path, encoding="utf-8") as file:
+        assert [line.split("\t")[2] for line in file.read().splitlines()] == ["02", "02"]
+    assert os.path.exists(path + ".buckets")
+
+    reloaded = PlayHistory(path)
+    assert reloaded.plays_in_last_days(30, now) == {"01": 1, "02": 2}
+    reloaded.record("01", now)
+    assert reloaded.plays_in_last_days(1, now) == {"01": 1, "02": 2}
+    reloaded.close()
+
+def test_old_buckets_expire(tmp_path):
+    path = str(tmp_path / "plays")
+    history = PlayHistory(path)
+    history.record("01", time.time() - 500 * DAY)
+    history.close()
+    assert PlayHistory(path, keep_days=400).plays_in_last_days(1000) == {}
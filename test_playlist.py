@@ -0,0 +1,44 @@
+import json
+from playlist import Playlist, PlaylistStore
+
+def test_ordered_set_operations():
+    playlist = Playlist("mix", ["01", "02", "03"])
+    assert not playlist.add("02")
+    assert playlist.extend(["04", "01", "05"]) == ["04", "05"]
+    assert playlist.remove("03") and not playlist.remove("03")
+    assert list(playlist) == ["01", "02", "04", "05"]
+
+    playlist.move("05", before="01")
+    playlist.move_up("04")
+    playlist.move_down("05")
+    assert playlist.keys() == ["01", "05", "04", "02"]
+    assert playlist[1] == "05" and playlist[-1] == "02"
+    playlist.add("06", before="05")
+    playlist.move("01")
+    assert playlist.keys() == ["06", "05", "04", "02", "01"]
+    assert "04" in playlist and len(playlist) == 5
+
+def test_store_loads_on_demand(tmp_path):
+    legacy = tmp_path / "playlist.csv"
+    legacy.write_text("1\n02\n\n", encoding="utf-8")
+    folder = tmp_path / "playlists"
+    store = PlaylistStore(str(folder), str(legacy))
+    assert store.names() == ["playlist"]
+    assert store.get("playlist").keys() == ["01", "02"]
+
+    road_trip = Playlist("Road Trip", ["03", "01"])
+    store.save(road_trip)
+    road_trip.add("09")                      # not saved
+    store.save(Playlist("road trip!", ["04"]))
+
+    reopened = PlaylistStore(str(folder), str(legacy))
+    assert reopened.names() == ["playlist", "Road Trip", "road trip!"]
+    assert reopened.track_count("Road Trip") == 2
+    assert reopened._loaded == {}            # nothing read until asked for
+    assert reopened.get("Road Trip").keys() == ["03", "01"]
+    assert reopened.get("road trip!").keys() == ["04"]
+
+    assert reopened.delete("Road Trip")
+    index = json.loads((folder / "index.json").read_text(encoding="utf-8"))
+    assert list(index) == ["playlist", "road trip!"]
+    assert sorted(path.name for path in folder.iterdir()) == ["index.json", "playlist.txt", "road_trip_2.txt"]
@@ -0,0 +1,35 @@
+import threading
+from save_worker import SaveWorker
+
+def test_queued_job_runs_once():
+    worker = SaveWorker()
+    release = threading.Event()
+    calls = []
+    events = []
+    worker.subscribe(events.append)
+
+    worker.submit(release.wait)          # keeps the worker busy
+    for _ in range(5):
+        worker.submit(lambda: None)      # distinct jobs all run
+    job = lambda: calls.append(1)
+    for _ in range(5):
+        worker.submit(job)               # the same job queued five times runs once
+    release.set()
+    assert worker.wait(timeout=5)
+    assert calls == [1]
+    assert worker.collapsed == 4
+    assert worker.runs == 7
+    assert events[-1].pending is False
+    worker.close()
+
+def test_errors_are_reported():
+    worker = SaveWorker()
+    events = []
+    worker.subscribe(events.append)
+
+    def fail():
+        raise OSError("disk full")
+    worker.submit(fail)
+    worker.close(timeout=5)
+    assert [str(event.error) for event in events] == ["disk full"]
+    assert worker.submit(fail) is False
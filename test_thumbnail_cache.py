@@ -0,0 +1,59 @@
+import importlib
+import os
+import sys
+import threading
+import types
+import pytest
+
+class FakeDecoder:
+    # Stands in for PIL.Image: open(source).convert(mode).resize(size).save(file, "PNG").
+    # Every save waits until all workers are mid-write, then one of them lists the folder.
+    def __init__(self, workers, folder):
+        self.barrier = threading.Barrier(workers)
+        self.folder = folder
+        self.during = None
+    def open(self, source):
+        return self
+    def convert(self, mode):
+        return self
+    def resize(self, size):
+        return self
+    def save(self, file, fmt):
+        file.write(b"png")
+        if self.barrier.wait(timeout=5) == 0:
+            self.during = sorted(os.listdir(self.folder))
+        self.barrier.wait(timeout=5)
+
+@pytest.fixture
+def thumbnail_cache(monkeypatch):
+    # The decoder is replaced in each test, so this runs with or without Pillow
+    pil = types.ModuleType("PIL")
+    pil.Image = None
+    monkeypatch.setitem(sys.modules, "PIL", pil)
+    monkeypatch.delitem(sys.modules, "thumbnail_cache", raising=False)
+    yield importlib.import_module("thumbnail_cache")
+    sys.modules.pop("thumbnail_cache", None)
+
+def test_concurrent_decodes_write_own_temp_files(tmp_path, monkeypatch, thumbnail_cache):
+    covers = tmp_path / "covers"
+    covers.mkdir()
+    (covers / "01.jpg").write_bytes(b"jpeg")
+    cache = thumbnail_cache.ThumbnailCache(str(covers), str(tmp_path / "thumbs"))
+    folder = tmp_path / "thumbs" / "01"
+    folder.mkdir()
+    (folder / "1_1.png").write_bytes(b"older cover")
+    decoder = FakeDecoder(4, str(folder))
+    monkeypatch.setattr(thumbnail_cache, "Image", decoder)
+
+    paths = []
+    workers = [threading.Thread(target=lambda: paths.append(cache.thumbnail_path("01"))) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    # Mid-write: the old thumbnail is gone and each decode has its own temp file
+    assert len(decoder.during) == 4 and all(name.endswith(".tmp") for name in decoder.during)
+    assert len(set(paths)) == 1
+    assert os.listdir(folder) == [os.path.basename(paths[0])]
+    assert open(paths[0], "rb").read() == b"png"
@@ -0,0 +1,61 @@
+from library_item import LibraryItem, LibraryItemAlbum
+from track_columns import TrackColumnMap
+
+def make_map():
+    columns = TrackColumnMap()
+    columns.append_row("01", "Numb", "Linkin Park", 5, 10, "Meteora", 2003)
+    columns.append_row("02", "Imagine", "John Lennon", 4, 3)
+    columns.append_row("03", "In the End", "Linkin Park", 5, 25, "Hybrid Theory", 2000)
+    return columns
+
+def test_views_satisfy_item_interface():
+    columns = make_map()
+    album_view = columns["01"]
+    plain_view = columns["02"]
+
+    assert isinstance(album_view, LibraryItemAlbum)
+    assert isinstance(plain_view, LibraryItem) and not isinstance(plain_view, LibraryItemAlbum)
+    assert album_view.info() == "Numb - Linkin Park (Meteora, 2003) *****"
+    assert plain_view.info() == "Imagine - John Lennon ****"
+    assert plain_view.year is None
+    assert not hasattr(plain_view, "__dict__")
+
+def test_view_writes_go_to_columns():
+    columns = make_map()
+    columns["02"].play_count += 1
+    columns["02"].rating = 2
+    assert columns.get("02").play_count == 4
+    assert columns.get("02").stars() == "**"
+
+def test_set_and_delete_keep_order():
+    columns = make_map()
+    columns["02"] = LibraryItemAlbum("Imagine", "John Lennon", 4, "Imagine", 1971)
+    del columns["01"]
+    columns["04"] = LibraryItem("Yesterday", "The Beatles", 3)
+
+    assert list(columns) == ["02", "03", "04"]
+    assert columns["02"].album == "Imagine"
+    assert columns.get("01") is None
+
+def test_column_aggregates():
+    columns = make_map()
+    assert columns.keys_with_rating(5) == ["01", "03"]
+    assert columns.keys_in_play_range(0, 10) == ["01", "02"]
+
+    del columns["01"]
+    assert columns.keys_with_rating(5) == ["03"]
+    assert columns.keys_in_play_range(0) == ["02", "03"]
+
+def test_large_years_fit_and_bad_rows_stay_whole():
+    columns = make_map()
+    columns.append_row("04", "Far Future", "Nobody", 200, 0, "Later", 99999)
+    assert columns["04"].year == 99999 and columns["04"].rating == 200
+
+    try:
+        columns.append_row("01", "Changed", "Someone", 3, 2 ** 70, "Other", 1990)
+    except OverflowError:
+        pass
+    else:
+        assert False, "plays out of range should be refused"
+    assert columns["01"].info() == "Numb - Linkin Park (Meteora, 2003) *****"
+    assert columns["01"].play_count == 10
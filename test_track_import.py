@@ -0,0 +1,64 @@
+import os
+from track_import import import_tracks, main, read_manifest, scan_folder
+from track_library import TrackLibrary
+
+def test_scan_folder(tmp_path):
+    (tmp_path / "Queen - Bohemian Rhapsody.mp3").write_bytes(b"a")
+    (tmp_path / "Queen - Bohemian Rhapsody.jpg").write_bytes(b"i")
+    (tmp_path / "Untitled.mp3").write_bytes(b"b")
+    (tmp_path / "notes.txt").write_text("x")
+
+    entries = scan_folder(str(tmp_path))
+    assert [(entry.name, entry.artist) for entry in entries] == [
+        ("Bohemian Rhapsody", "Queen"), ("Untitled", "Unknown")]
+    assert entries[0].image_path.endswith("Bohemian Rhapsody.jpg")
+    assert entries[1].image_path is None
+
+def test_import_copies_media_and_commits_once(csv_path, tmp_path, open_library):
+    lib = open_library(csv_path)
+    source = tmp_path / "source"
+    source.mkdir()
+    for name in ("A - One", "B - Two", "C - Three"):
+        (source / f"{name}.mp3").write_bytes(name.encode())
+    writes = []
+    save_all = lib.storage.save_all
+    lib.storage.save_all = lambda library: (writes.append(len(library)), save_all(library))
+    progress = []
+
+    result = import_tracks(lib, scan_folder(str(source)), workers=2,
+                           progress=lambda done, total: progress.append((done, total)))
+
+    assert result.added == ["03", "04", "05"]
+    assert writes == [5]
+    assert progress[-1] == (3, 3)
+    assert open(os.path.join(lib.sound_folder, "04.mp3"), "rb").read() == b"B - Two"
+    assert TrackLibrary(lib.track_csv).get_name("05") == "Three"
+
+def test_import_manifest_skips_taken_ids_and_missing_audio(csv_path, tmp_path, open_library):
+    lib = open_library(csv_path)
+    (tmp_path / "song.mp3").write_bytes(b"s")
+    manifest = tmp_path / "manifest.csv"
+    manifest.write_text(
+        "track_id,name,artist,rating,year,audio\n"
+        "1,Clash,Someone,3,,song.mp3\n"
+        "7,Seven,Someone,4,1999,song.mp3\n"
+        "8,Missing,Someone,2,,nowhere.mp3\n",
+        encoding="utf-8")
+
+    result = import_tracks(lib, read_manifest(str(manifest)))
+    assert result.added == ["07"]
+    assert result.skipped == ["01"]
+    assert result.errors == [("08", "audio copy failed")]
+    assert lib.get_item("07").year is None  # no album, so a plain item
+    assert lib.get_rating("07") == 4
+
+def test_script_runs_the_cli_import(csv_path, tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    source = tmp_path / "source"
+    source.mkdir()
+    (source / "Queen - Bohemian Rhapsody.mp3").write_bytes(b"a")
+
+    assert main([str(source), "--workers", "1"]) == 0
+    assert "Added 1 tracks" in capsys.readouterr().out
+    assert TrackLibrary("tracks.csv", use_journal=True).get_name("03") == "Bohemian Rhapsody"
+    assert (tmp_path / "track_sounds" / "03.mp3").read_bytes() == b"a"
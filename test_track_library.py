@@ -0,0 +1,240 @@
+import os
+import threading
+from track_library import ChangeTracker
+from track_storage import SqliteTrackStorage
+
+def test_load_library(csv_path, open_library):
+    lib = open_library(csv_path)
+    assert lib.get_keys() == ["01", "02"]
+    assert lib.get_item("01").album == "Meteora"
+    assert lib.get_play_count("02") == 3
+
+def test_journal_mode_does_not_rewrite_csv(csv_path, open_library, csv_text):
+    lib = open_library(csv_path, use_journal=True)
+    lib.increment_play_count("01")
+    lib.set_rating("02", 1)
+    lib.close()
+
+    with open(csv_path, encoding="utf-8") as file:
+        assert file.read() == csv_text
+    assert os.path.exists(lib.storage.journal_file)
+
+def test_journal_replayed_on_load(csv_path, open_library):
+    lib = open_library(csv_path, use_journal=True)
+    lib.increment_play_count("01")
+    lib.add_track("03", "Numb", "Linkin Park", 3)
+    lib.remove_track("02")
+    lib.update_track("03", album="Meteora", year=2003)
+    lib.close()
+
+    reloaded = open_library(csv_path, use_journal=True)
+    assert reloaded.get_keys() == ["01", "03"]
+    assert reloaded.get_play_count("01") == 11
+    assert reloaded.get_item("03").info() == "Numb - Linkin Park (Meteora, 2003) ***"
+    assert not os.path.exists(reloaded.storage.journal_file)
+
+def test_compact_folds_journal_into_csv(csv_path, open_library):
+    lib = open_library(csv_path, use_journal=True)
+    lib.increment_play_count("02")
+    lib.compact()
+
+    assert not os.path.exists(lib.storage.journal_file)
+    assert open_library(csv_path).get_play_count("02") == 4
+
+def test_write_behind_coalesces_plays(csv_path, open_library):
+    lib = open_library(csv_path, use_journal=True, write_behind=True, flush_interval=60)
+    for _ in range(5):
+        lib.increment_play_count("01")
+    lib.set_rating("01", 2)
+
+    assert lib.write_stats() == {"pending_writes": 6, "dirty_tracks": 1, "flushed_writes": 0, "flushes": 0}
+    assert not os.path.exists(lib.storage.journal_file)
+
+    lib.close()
+    assert lib.write_stats()["flushed_writes"] == 6
+    assert lib.write_stats()["flushes"] == 1
+    with open(lib.storage.journal_file, encoding="utf-8") as file:
+        assert len(file.readlines()) == 1
+
+    reloaded = open_library(csv_path)
+    assert reloaded.get_play_count("01") == 15
+    assert reloaded.get_rating("01") == 2
+
+def test_write_behind_keeps_order_of_re_added_tracks(csv_path, open_library):
+    lib = open_library(csv_path, lazy_load=True, use_journal=True, write_behind=True, flush_interval=60)
+    lib.remove_track("01")
+    lib.add_track("03", "Faint", "Linkin Park", 4)
+    lib.add_track("01", "Numb", "Linkin Park", 3)
+    lib.update_track("01", album="Meteora", year=2003)
+    lib.close()
+
+    assert lib.get_keys() == ["02", "03", "01"]
+    assert open_library(csv_path, lazy_load=True, use_journal=True).get_keys() == ["02", "03", "01"]
+
+def test_write_behind_flushes_at_threshold(csv_path, open_library):
+    lib = open_library(csv_path, write_behind=True, flush_interval=60, flush_threshold=3)
+    events = []
+    lib.subscribe_saves(events.append)
+    for _ in range(3):
+        lib.increment_play_count("02")
+
+    # the flush runs on the save worker, not in the caller
+    assert lib.wait_for_saves(timeout=5)
+    assert lib.write_stats()["pending_writes"] == 0
+    assert [event.error for event in events] == [None]
+    assert open_library(csv_path).get_play_count("02") == 6
+
+def test_background_save_replaces_csv(csv_path, open_library):
+    lib = open_library(csv_path)
+    lib.set_rating("01", 1)
+    lib.save_library_to_csv(background=True)
+    assert lib.wait_for_saves(timeout=5)
+    assert not os.path.exists(csv_path + ".tmp")
+    assert open_library(csv_path).get_rating("01") == 1
+
+def test_memory_queries(csv_path, open_library):
+    lib = open_library(csv_path)
+    assert lib.search("IN") == ["01", "02"]
+    assert lib.find_by_artist("linkin park") == ["01"]
+    assert lib.find_by_rating(4) == ["02"]
+    assert lib.find_by_play_range(0, 5) == ["02"]
+    assert lib.find_by_play_range(5) == ["01"]
+    assert lib.get_artists() == ["John Lennon", "Linkin Park"]
+
+def test_column_library_filters_without_building_indexes(csv_path, open_library):
+    lib = open_library(csv_path, use_snapshot=False)
+    assert lib.find_by_rating(4) == ["02"]
+    assert lib.find_by_play_range(5) == ["01"]
+    assert lib._field_indexes is None
+
+    lib.remove_track("01")
+    lib.add_track("01", "Numb", "Linkin Park", 4)
+    assert lib.find_by_rating(4) == ["02", "01"]
+    assert lib.get_artists() == ["John Lennon", "Linkin Park"]  # builds the indexes
+    assert lib.find_by_rating(4) == ["02", "01"]
+
+def test_sqlite_storage_imports_csv_and_queries(csv_path, tmp_path, open_library):
+    storage = SqliteTrackStorage(str(tmp_path / "tracks.db"), import_csv=csv_path)
+    lib = open_library(csv_path, storage=storage, write_behind=True, flush_interval=60)
+    assert lib.get_keys() == ["01", "02"]
+    assert lib.get_item("01").info() == "Numb - Linkin Park (Meteora, 2003) *****"
+
+    lib.increment_play_count("02")
+    lib.add_track("03", "Lose Yourself", "Eminem", 5)
+    assert lib.search("in") == ["01", "02", "03"]
+    assert lib.search("LENNON") == ["02"]
+    assert lib.search("yourself") == ["03"]
+    assert lib.find_by_artist("EMINEM") == ["03"]
+    assert lib.find_by_rating(5) == ["01", "03"]
+    assert lib.find_by_play_range(4, 4) == ["02"]
+    lib.remove_track("01")
+    lib.close()
+
+    reloaded = open_library(csv_path, storage=SqliteTrackStorage(str(tmp_path / "tracks.db")))
+    assert reloaded.get_keys() == ["02", "03"]
+    assert reloaded.get_play_count("02") == 4
+    assert reloaded.search("numb") == []
+
+def test_lazy_load_builds_items_on_first_access(tmp_path, open_library, csv_text):
+    path = tmp_path / "tracks.csv"
+    path.write_text(csv_text + '03,"Hello, Goodbye",The Beatles,3,7,"Magical\nMystery Tour",1967\n',
+                    encoding="utf-8")
+    lib = open_library(str(path), lazy_load=True, use_journal=True)
+
+    assert lib.get_keys() == ["01", "02", "03"]
+    assert lib.library.loaded("03") is None
+    assert lib.get_item("03").info() == "Hello, Goodbye - The Beatles (Magical\nMystery Tour, 1967) ***"
+    assert [row["plays"] for row in lib.iter_rows()] == [10, 3, 7]
+
+    lib.increment_play_count("02")
+    lib.compact()
+    assert lib.library.loaded("01") is None
+    assert lib.get_item("01").album == "Meteora"
+
+    reloaded = open_library(str(path))
+    assert reloaded.get_play_count("02") == 4
+    assert reloaded.get_item("03").name == "Hello, Goodbye"
+
+def test_search_index_follows_mutations(csv_path, open_library):
+    lib = open_library(csv_path)
+    assert lib.search("numb") == ["01"]
+
+    lib.update_track("01", name="Faint")
+    lib.add_track("03", "Numb/Encore", "Jay-Z", 4)
+    lib.remove_track("02")
+    assert lib.search("numb") == ["03"]
+    assert lib.search("faint") == ["01"]
+    assert lib.search("imagine") == []
+    assert lib.search("") == ["01", "03"]
+
+def test_field_indexes_follow_plays(csv_path, open_library):
+    lib = open_library(csv_path)
+    assert lib.find_by_play_range(11) == []
+
+    lib.increment_play_count("01")
+    lib.set_rating("02", 5)
+    assert lib.find_by_play_range(11) == ["01"]
+    assert lib.find_by_rating(5) == ["01", "02"]
+    assert lib.artist_counts() == [("John Lennon", 1), ("Linkin Park", 1)]
+
+def test_change_events_and_tracker(csv_path, open_library):
+    lib = open_library(csv_path)
+    events = []
+    lib.subscribe(events.append)
+    tracker = ChangeTracker(lib)
+    assert not tracker.changed()
+
+    lib.increment_play_count("01")
+    lib.update_track("02", artist="Lennon")
+    lib.add_track("03", "Numb", "Linkin Park", 3)
+    lib.remove_track("03")
+
+    assert [(e.kind, e.key, e.fields) for e in events] == [
+        ("updated", "01", {"plays"}),
+        ("updated", "02", {"artist"}),
+        ("added", "03", None),
+        ("removed", "03", None),
+    ]
+    assert events[-1].version == lib.version
+    assert tracker.changed()
+    assert tracker.take() == ({"01", "02"}, ["03"], False)
+    assert not tracker.changed()
+
+def test_background_save_while_adding(csv_path, open_library):
+    lib = open_library(csv_path, use_journal=True, use_snapshot=False)
+    errors = []
+    done = threading.Event()
+
+    def save_repeatedly():
+        while not done.is_set():
+            try:
+                lib.storage.save_all(lib.library)
+            except Exception as e:
+                errors.append(e)
+                return
+    saver = threading.Thread(target=save_repeatedly)
+    saver.start()
+    for i in range(3, 20003):
+        lib.add_track(str(i).zfill(2), f"Track {i}", "Artist", 3)
+    done.set()
+    saver.join()
+
+    assert errors == []
+    lib.save_library_to_csv()
+    assert len(open_library(csv_path).get_keys()) == 20002
+
+def test_lazy_rows_survive_a_rewrite_mid_scan(tmp_path, open_library):
+    path = tmp_path / "tracks.csv"
+    path.write_text("name,track_id,artist,rating,plays,album,year\n"
+                    "Numb,01,Linkin Park,5,10,Meteora,2003\n"
+                    "Imagine,02,John Lennon,4,3,,\n"
+                    "Faint,03,Linkin Park,4,40,Meteora,2003\n", encoding="utf-8")
+    lib = open_library(str(path), lazy_load=True, use_journal=True, use_snapshot=False)
+    rows = lib.iter_rows()
+    first = next(rows)
+
+    # The save writes the columns in FIELDNAMES order, at new offsets
+    lib.update_track("01", name="Numb (Live at a Much Longer Venue Name)")
+    lib.compact()
+    assert [first["name"]] + [row["name"] for row in rows] == ["Numb", "Imagine", "Faint"]
+    assert [row["name"] for row in lib.iter_rows()][0].startswith("Numb (Live")
@@ -0,0 +1,78 @@
+import pytest
+import metrics
+from track_query import Album, All, Any, Artist, Ids, Plays, Query, Rating, Text, Year, parse_range
+
+EXTRA_ROWS = (
+    "03,In the End,Linkin Park,3,25,Hybrid Theory,2000\n"
+    "04,Faint,Linkin Park,4,40,Meteora,2003\n"
+    "05,Jealous Guy,John Lennon,2,0,Imagine,1971\n"
+)
+
+@pytest.fixture
+def lib(csv_path, open_library):
+    return open_library(csv_path)
+
+def test_conditions(lib):
+    assert lib.query(Query(Artist("linkin park"))) == ["01", "03", "04"]
+    assert lib.query(Query(Rating(4, 5))) == ["01", "02", "04"]
+    assert lib.query(Query(Plays(10, 30))) == ["01", "03"]
+    assert lib.query(Query(Album("meteora"))) == ["01", "04"]
+    assert lib.query(Query(Year(1990, 2001))) == ["03"]
+    assert lib.query(Query(Ids(["05", "99"]))) == ["05"]
+    assert lib.query(Query()) == ["01", "02", "03", "04", "05"]
+
+def test_and_or(lib):
+    assert lib.query(Query(All(Artist("Linkin Park"), Album("Meteora"), Rating(4)))) == ["04"]
+    assert lib.query(Query(Any(Text("imag"), Plays(40)))) == ["02", "04"]
+    # an OR with an unindexed part is answered by one scan
+    assert lib.query(Query(Any(Year(1971), Rating(3)))) == ["03", "05"]
+    assert lib.query(Query(All(Artist("John Lennon"), Any(Album("Imagine"), Rating(4))))) == ["02", "05"]
+
+def test_sort_and_limit(lib):
+    assert lib.query(Query(sort="plays", descending=True, limit=2)) == ["04", "03"]
+    assert lib.query(Query(Artist("Linkin Park"), sort="name")) == ["04", "03", "01"]
+    # tracks without a year go last in both directions
+    assert lib.query(Query(sort="year", descending=True))[-1] == "02"
+    assert lib.query(Query(sort="year"))[-1] == "02"
+
+def test_results_cached_until_library_changes(lib):
+    metrics.reset()
+    metrics.enable()
+    try:
+        query = Query(Plays(20))
+        assert lib.query(query) == ["03", "04"]
+        assert lib.query(query) == ["03", "04"]
+        assert metrics.snapshot()["counters"]["query.cache_hits"] == 1
+
+        for _ in range(20):
+            lib.increment_play_count("05")
+        assert lib.query(query) == ["03", "04", "05"]
+        lib.remove_track("03")
+        assert lib.query(query) == ["04", "05"]
+    finally:
+        metrics.disable()
+        metrics.reset()
+
+def test_play_buckets_and_ranges(lib):
+    assert lib.play_buckets() == ["0-2", "3-9", "10-24", "25+"]
+    assert parse_range("11-20") == (11, 20)
+    assert parse_range("51+") == (51, None)
+    assert Plays.parse("7") == Plays(7, 7)
+
+def test_sorted_views_follow_play_counts(lib):
+    assert lib.top("plays", 3) == ["04", "03", "01"]
+    for _ in range(38):
+        lib.increment_play_count("02")
+    assert lib.top("plays", 2) == ["02", "04"]
+    assert lib.sorted_keys("plays", start=1, stop=3) == ["01", "03"]
+    # ties keep library order in both directions
+    assert lib.sorted_keys("rating", descending=True) == ["01", "02", "04", "03", "05"]
+    assert lib.sorted_keys("rating") == ["05", "03", "02", "04", "01"]
+    assert lib.top("name", 2, descending=False) == ["04", "02"]
+    assert lib.top("year", 5) == ["01", "04", "03", "05", "02"]
+
+def test_sorted_pages(lib):
+    pages = [lib.query(Query(sort="plays", descending=True, limit=2, offset=offset)) for offset in (0, 2, 4)]
+    assert pages == [["04", "03"], ["01", "02"], ["05"]]
+    lib.remove_track("03")
+    assert lib.query(Query(Artist("Linkin Park"), "plays", True, 1, 1)) == ["01"]
@@ -0,0 +1,81 @@
+import io
+import os
+from track_columns import TrackColumnMap
+from track_snapshot import HEADER, read_snapshot, write_snapshot
+
+EXTRA_ROWS = "03,Faint,Linkin Park,4,40,Meteora,2003\n"
+
+def test_round_trip_skips_removed_rows(tmp_path):
+    columns = TrackColumnMap()
+    columns.append_row("01", "Numb", "Linkin Park", 5, 10, "Meteora", 2003)
+    columns.append_row("02", "Imagine", "John Lennon", 4, 3)
+    columns.append_row("03", "Faint", "Linkin Park", 4, 2**40, "Meteora", 2003)
+    del columns["02"]
+
+    path = tmp_path / "tracks.snap"
+    with open(path, mode="wb") as file:
+        assert write_snapshot(file, columns, (1, 2))
+    loaded = read_snapshot(str(path), (1, 2))
+    assert list(loaded) == ["01", "03"]
+    assert loaded["03"].info() == "Faint - Linkin Park (Meteora, 2003) ****"
+    assert loaded["03"].play_count == 2**40
+    assert read_snapshot(str(path), (1, 3)) is None  # made from another CSV
+
+    data = path.read_bytes()
+    path.write_bytes(data[:-1])
+    assert read_snapshot(str(path), (1, 2)) is None
+    path.write_bytes(b"JUNK" + data[4:])
+    assert read_snapshot(str(path), (1, 2)) is None
+
+def test_nul_in_text_is_not_written():
+    columns = TrackColumnMap()
+    columns.append_row("01", "Bad\0Name", "Artist", 1, 0)
+    file = io.BytesIO()
+    assert not write_snapshot(file, columns, (0, 0))
+    assert file.getvalue() == b""
+
+def test_library_loads_current_snapshot(csv_path, open_library):
+    lib = open_library(csv_path, use_journal=True)
+    lib.increment_play_count("02")
+    lib.compact()   # rewrites the CSV and the snapshot
+    assert os.path.getsize(csv_path + ".snap") > HEADER.size
+
+    # lazy mode would index the CSV; a current snapshot gives the column map instead
+    reloaded = open_library(csv_path, lazy_load=True)
+    assert isinstance(reloaded.library, TrackColumnMap)
+    assert reloaded.get_keys() == ["01", "02", "03"]
+    assert reloaded.get_play_count("02") == 4
+
+def test_stale_snapshot_is_ignored(csv_path, open_library):
+    open_library(csv_path).save_library_to_csv()
+    with open(csv_path, mode="a", encoding="utf-8") as file:
+        file.write("04,Woman,John Lennon,3,1,,\n")
+
+    lib = open_library(csv_path, lazy_load=True)
+    assert not isinstance(lib.library, TrackColumnMap)
+    assert lib.get_keys() == ["01", "02", "03", "04"]
+
+def test_close_waits_for_the_rebuild_and_load_sweeps_old_temp_files(csv_path, open_library):
+    stale = csv_path + ".snap.abc123.tmp"
+    with open(stale, mode="wb") as file:
+        file.write(b"cut short")
+    os.utime(stale, (0, 0))
+
+    lib = open_library(csv_path, lazy_load=True)
+    lib.close()
+    assert not os.path.exists(stale)
+    assert [name for name in os.listdir(os.path.dirname(csv_path)) if name.endswith(".tmp")] == []
+    assert isinstance(open_library(csv_path, lazy_load=True).library, TrackColumnMap)
+
+def test_journal_replayed_at_startup_keeps_the_snapshot_current(csv_path, open_library):
+    # GUI sessions that each leave journaled plays for the next start to fold in;
+    # the first one ran without a snapshot, so the second start reads the CSV
+    lib = open_library(csv_path, lazy_load=True, use_journal=True, use_snapshot=False)
+    lib.increment_play_count("02")
+    lib.close()
+    for plays in (5, 6, 7):
+        lib = open_library(csv_path, lazy_load=True, use_journal=True)
+        assert isinstance(lib.library, TrackColumnMap) == (plays > 5)
+        lib.increment_play_count("02")
+        lib.close()
+        assert lib.get_play_count("02") == plays
@@ -0,0 +1,100 @@
+#thumbnail_cache.py
+import os
+import tempfile
+import tkinter as tk
+from collections import OrderedDict
+from PIL import Image
+
+class ThumbnailCache:
+    # Cover art at display size. Thumbnails are written once to cache_folder/<track_id>/
+    # as PNG, named after the source's mtime and size so a replaced cover gets a new
+    # file, and Tk loads them directly without PIL. Recently used PhotoImages stay in an LRU.
+    def __init__(self, img_folder="track_images", cache_folder=".thumbnails", size=(100, 100),
+                 capacity=256, fallback="no_image.jpg", master=None):
+        self.img_folder = img_folder
+        self.cache_folder = cache_folder
+        self.size = size
+        self.capacity = capacity
+        self.fallback = fallback
+        self.master = master
+        self._photos = OrderedDict()    # track_id -> (thumbnail path, PhotoImage)
+        self._fallback_photo = None
+        os.makedirs(cache_folder, exist_ok=True)
+
+    def get(self, key):
+        path = self.thumbnail_path(key)
+        return self.photo_for(key, path)
+
+    def cached(self, key):
+        # PhotoImage for the track if it can be had without decoding a JPEG, else None
+        source = os.path.join(self.img_folder, f"{key}.jpg")
+        if not os.path.exists(source):
+            return self.fallback_photo()
+        path = self._thumbnail_file(key, source)
+        cached = self._photos.get(key)
+        if (cached is not None and cached[0] == path) or os.path.exists(path):
+            return self.photo_for(key, path)
+        return None
+
+    def photo_for(self, key, path):
+        # Tk part of get(); must run on the Tk thread
+        if path is None:
+            return self.fallback_photo()
+        cached = self._photos.get(key)
+        if cached is not None and cached[0] == path:
+            self._photos.move_to_end(key)
+            return cached[1]
+
+        photo = tk.PhotoImage(file=path, master=self.master)
+        self._photos[key] = (path, photo)
+        self._photos.move_to_end(key)
+        while len(self._photos) > self.capacity:
+            self._photos.popitem(last=False)
+        return photo
+
+    def fallback_photo(self):
+        # Decoded once and shared by every track without a cover
+        if self._fallback_photo is None:
+            path = self._cached_thumbnail("_fallback", os.path.join(self.img_folder, self.fallback))
+            self._fallback_photo = tk.PhotoImage(file=path, master=self.master)
+        return self._fallback_photo
+
+    def thumbnail_path(self, key):
+        # Path of the on-disk thumbnail for this track, or None when it has no cover.
+        # Only touches files and PIL, so it is safe to call from a worker thread.
+        source = os.path.join(self.img_folder, f"{key}.jpg")
+        if not os.path.exists(source):
+            return None
+        return self._cached_thumbnail(key, source)
+
+    def _thumbnail_file(self, name, source):
+        stat = os.stat(source)
+        return os.path.join(self.cache_folder, name, f"{stat.st_mtime_ns}_{stat.st_size}.png")
+    def _cached_thumbnail(self, name, source):
+        path = self._thumbnail_file(name, source)
+        if os.path.exists(path):
+            return path
+
+        # Drop thumbnails made from an older version of this cover. Workers may be
+        # decoding this track at the same time: their .tmp files are left alone.
+        folder = os.path.dirname(path)
+        os.makedirs(folder, exist_ok=True)
+        for old in os.listdir(folder):
+            if old.endswith(".png") and old != os.path.basename(path):
+                try:
+                    os.remove(os.path.join(folder, old))
+                except FileNotFoundError:
+                    pass  # another worker removed it first
+
+        image = Image.open(source).convert("RGB").resize(self.size)
+        # Own temp name per decode; whichever finishes last replaces an identical file
+        handle, tmp_path = tempfile.mkstemp(".tmp", "", folder)
+        try:
+            with open(handle, mode="wb") as file:
+                image.save(file, "PNG")
+            os.replace(tmp_path, path)
+            tmp_path = None
+        finally:
+            if tmp_path is not None:
+                os.remove(tmp_path)
+        return path
@@ -0,0 +1,173 @@
+#track_columns.py
+import sys
+from array import array
+from collections.abc import MutableMapping
+from library_item import LibraryItem, LibraryItemAlbum
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # aggregates fall back to loops over the arrays
+
+INT_MIN, INT_MAX = -2 ** 31, 2 ** 31 - 1      # ratings and years ("i")
+LONG_MIN, LONG_MAX = -2 ** 63, 2 ** 63 - 1    # plays ("q")
+
+class _ColumnFields:
+    # Properties that read and write one row of a TrackColumnMap instead of instance fields
+    __slots__ = ()
+
+    @property
+    def name(self):
+        return self._columns.names[self._row]
+    @name.setter
+    def name(self, value):
+        self._columns.names[self._row] = sys.intern(value)
+
+    @property
+    def artist(self):
+        return self._columns.artists[self._row]
+    @artist.setter
+    def artist(self, value):
+        self._columns.artists[self._row] = sys.intern(value)
+
+    @property
+    def rating(self):
+        return self._columns.ratings[self._row]
+    @rating.setter
+    def rating(self, value):
+        self._columns.ratings[self._row] = value
+
+    @property
+    def play_count(self):
+        return self._columns.plays[self._row]
+    @play_count.setter
+    def play_count(self, value):
+        self._columns.plays[self._row] = value
+
+    @property
+    def album(self):
+        return self._columns.albums[self._row]
+    @album.setter
+    def album(self, value):
+        self._columns.albums[self._row] = sys.intern(value)
+
+    @property
+    def year(self):
+        return self._columns.years[self._row] or None
+    @year.setter
+    def year(self, value):
+        self._columns.years[self._row] = value or 0
+
+class TrackView(_ColumnFields, LibraryItem):
+    __slots__ = ("_columns", "_row")
+
+    def __init__(self, columns, row):
+        self._columns = columns
+        self._row = row
+
+class AlbumTrackView(_ColumnFields, LibraryItemAlbum):
+    __slots__ = ("_columns", "_row")
+
+    def __init__(self, columns, row):
+        self._columns = columns
+        self._row = row
+
+class TrackColumnMap(MutableMapping):
+    # Ordered track_id -> item mapping that stores every field in a column instead of
+    # one object per track. Reads return small views; writes go straight to the columns.
+    def __init__(self):
+        self._rows = {}                 # track_id -> row number
+        self.keys_by_row = []           # row number -> track_id, None once removed
+        self.names = []
+        self.artists = []
+        self.albums = []
+        self.ratings = array("i")       # -1 marks a removed row
+        self.plays = array("q")
+        self.years = array("i")         # 0 means no year
+
+    @classmethod
+    def from_columns(cls, keys, names, artists, albums, ratings, plays, years):
+        # Adopts ready-made columns (lists and arrays of one length) without copying
+        columns = cls()
+        columns._rows = dict(zip(keys, range(len(keys))))
+        columns._rows.pop(None, None)   # removed rows
+        columns.keys_by_row = keys
+        columns.names, columns.artists, columns.albums = names, artists, albums
+        columns.ratings, columns.plays, columns.years = ratings, plays, years
+        return columns
+    def copy(self):
+        # Rows only ever get appended, so cutting every column at the row count read
+        # first gives a consistent copy even while another thread adds tracks
+        count = len(self.keys_by_row)
+        return TrackColumnMap.from_columns(self.keys_by_row[:count], self.names[:count], self.artists[:count],
+                                           self.albums[:count], self.ratings[:count], self.plays[:count],
+                                           self.years[:count])
+
+    def append_row(self, key, name, artist, rating, plays, album="", year=None):
+        # Numbers are checked before any column changes, so a bad one leaves the row as it was
+        if not (INT_MIN <= rating <= INT_MAX and INT_MIN <= (year or 0) <= INT_MAX
+                and LONG_MIN <= plays <= LONG_MAX):
+            raise OverflowError(f"{key}: rating, plays or year out of range")
+        row = self._rows.get(key)
+        if row is None:
+            self._rows[key] = len(self.keys_by_row)
+            self.keys_by_row.append(key)
+            self.names.append(sys.intern(name))
+            self.artists.append(sys.intern(artist))
+            self.albums.append(sys.intern(album or ""))
+            self.ratings.append(rating)
+            self.plays.append(plays)
+            self.years.append(year or 0)
+        else:
+            self.names[row] = sys.intern(name)
+            self.artists[row] = sys.intern(artist)
+            self.albums[row] = sys.intern(album or "")
+            self.ratings[row] = rating
+            self.plays[row] = plays
+            self.years[row] = year or 0
+
+    def __getitem__(self, key):
+        return self._view(self._rows[key])
+    def __setitem__(self, key, item):
+        self.append_row(key, item.name, item.artist, item.rating, item.play_count,
+                        getattr(item, "album", ""), getattr(item, "year", None))
+    def __delitem__(self, key):
+        row = self._rows.pop(key)
+        self.keys_by_row[row] = None
+        self.ratings[row] = -1
+        self.plays[row] = 0
+    def __contains__(self, key):
+        return key in self._rows
+    def __iter__(self):
+        return iter(self._rows)
+    def __len__(self):
+        return len(self._rows)
+    def get(self, key, default=None):
+        row = self._rows.get(key)
+        return default if row is None else self._view(row)
+
+    def _view(self, row):
+        # Same rule as make_item: only tracks with both album and year are album items
+        if self.albums[row] and self.years[row]:
+            return AlbumTrackView(self, row)
+        return TrackView(self, row)
+
+    # --- Aggregates over whole columns ---
+
+    def keys_with_rating(self, rating):
+        if np is not None:
+            rows = np.flatnonzero(np.frombuffer(self.ratings, dtype=np.int32) == rating)
+        else:
+            rows = [row for row, value in enumerate(self.ratings) if value == rating]
+        return [self.keys_by_row[row] for row in rows]
+    def keys_in_play_range(self, low, high=None):
+        if np is not None:
+            plays = np.frombuffer(self.plays, dtype=np.int64)
+            mask = (plays >= low) & (np.frombuffer(self.ratings, dtype=np.int32) >= 0)
+            if high is not None:
+                mask &= plays <= high
+            rows = np.flatnonzero(mask)
+        else:
+            rows = [row for row, value in enumerate(self.plays)
+                    if value >= low and (high is None or value <= high) and self.ratings[row] >= 0]
+        return [self.keys_by_row[row] for row in rows]
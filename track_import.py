@@ -0,0 +1,138 @@
+#track_import.py
+import argparse
+import csv
+import os
+import sys
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# track_id may be None (the next free id is used); image_path may be None
+ImportEntry = namedtuple("ImportEntry", ["track_id", "name", "artist", "rating", "album", "year",
+                                         "image_path", "audio_path"])
+# added: new track ids; skipped: ids already taken; errors: (track_id or name, message)
+ImportResult = namedtuple("ImportResult", ["added", "skipped", "errors"])
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg")
+
+def scan_folder(folder):
+    # One entry per .mp3, with a .jpg/.jpeg of the same name as its cover. File names
+    # of the form "Artist - Title" fill in both fields; anything else is just the title.
+    audio = {}
+    images = {}
+    for entry in os.scandir(folder):
+        stem, ext = os.path.splitext(entry.name)
+        if ext.lower() == ".mp3":
+            audio[stem] = entry.path
+        elif ext.lower() in IMAGE_EXTENSIONS:
+            images[stem] = entry.path
+
+    entries = []
+    for stem in sorted(audio):
+        artist, _, name = stem.partition(" - ")
+        if not name:
+            artist, name = "Unknown", stem
+        entries.append(ImportEntry(None, name.strip(), artist.strip(), 0, "", None,
+                                   images.get(stem), audio[stem]))
+    return entries
+
+def read_manifest(path):
+    # CSV with name, artist and audio columns; track_id, rating, album, year and image
+    # are optional. Relative file paths are taken from the manifest's folder.
+    base = os.path.dirname(os.path.abspath(path))
+
+    def resolve(value):
+        value = (value or "").strip()
+        return os.path.join(base, value) if value else None
+
+    entries = []
+    with open(path, mode="r", encoding="utf-8", newline="") as file:
+        for row in csv.DictReader(file):
+            track_id = (row.get("track_id") or "").strip()
+            rating = (row.get("rating") or "").strip()
+            year = (row.get("year") or "").strip()
+            entries.append(ImportEntry(track_id.zfill(2) if track_id else None,
+                                       row["name"].strip(), row["artist"].strip(),
+                                       min(int(rating), 5) if rating.isdigit() else 0,
+                                       (row.get("album") or "").strip(),
+                                       int(year) if year.isdigit() else None,
+                                       resolve(row.get("image")), resolve(row["audio"])))
+    return entries
+
+def load_entries(source):
+    return scan_folder(source) if os.path.isdir(source) else read_manifest(source)
+
+def import_tracks(lib, entries, workers=8, progress=None):
+    # Stores media on a thread pool (files already in the media store are only hashed),
+    # then adds every track whose audio arrived in a single library commit.
+    # progress(done, total) runs on the calling thread.
+    taken = set(lib.get_keys())
+    next_id = max((int(key) for key in taken if key.isdigit()), default=0) + 1
+    planned = []
+    skipped = []
+    errors = []
+    for entry in entries:
+        if not entry.audio_path:
+            errors.append((entry.track_id or entry.name, "no audio file"))
+            continue
+        if entry.track_id is None:
+            while str(next_id).zfill(2) in taken:
+                next_id += 1
+            entry = entry._replace(track_id=str(next_id).zfill(2))
+        if entry.track_id in taken:
+            skipped.append(entry.track_id)
+            continue
+        taken.add(entry.track_id)
+        planned.append(entry)
+
+    copied = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        jobs = {pool.submit(_copy_media, lib, entry): entry for entry in planned}
+        for done, job in enumerate(as_completed(jobs), start=1):
+            entry = jobs[job]
+            audio_ok, image_error = job.result()
+            if image_error:
+                errors.append((entry.track_id, image_error))
+            if audio_ok:
+                copied.append(entry)
+            else:
+                errors.append((entry.track_id, "audio copy failed"))
+            if progress is not None:
+                progress(done, len(planned))
+
+    # Keep the manifest's order rather than the order the copies finished in
+    order = {entry.track_id: position for position, entry in enumerate(planned)}
+    copied.sort(key=lambda entry: order[entry.track_id])
+    added = lib.add_tracks([(entry.track_id, entry.name, entry.artist, entry.rating,
+                             entry.album, entry.year) for entry in copied])
+    return ImportResult(added, skipped, errors)
+
+def _copy_media(lib, entry):
+    # Runs on a worker: returns (audio copied, image error message or None)
+    try:
+        lib.sounds.put(entry.track_id, entry.audio_path)
+    except OSError:
+        return False, None
+    if entry.image_path:
+        try:
+            lib.images.put(entry.track_id, entry.image_path)
+        except OSError as e:
+            return True, f"image copy failed: {e}"
+    return True, None
+
+def main(argv=None):
+    # Kept for "python track_import.py ..."; the work is done by library_cli's import
+    # command, which also takes the library's process lock
+    from library_cli import main as cli_main
+
+    parser = argparse.ArgumentParser(description="Import a folder of .mp3 files or a manifest CSV into the library.")
+    parser.add_argument("source", help="folder to scan or manifest CSV")
+    parser.add_argument("--csv", default="tracks.csv", help="library CSV (default: tracks.csv)")
+    parser.add_argument("--sqlite", metavar="DB", help="import into a SQLite library instead")
+    parser.add_argument("--workers", type=int, default=8, help="parallel file copies (default: 8)")
+    args = parser.parse_args(argv)
+
+    sqlite = ["--sqlite", args.sqlite] if args.sqlite else []
+    return cli_main(["--csv", args.csv, *sqlite, "import", args.source, "--workers", str(args.workers)])
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,101 +1,335 @@
 #track_library.py
-import csv
-import os
-import shutil
-from library_item import LibraryItem, LibraryItemAlbum
+import threading
+from collections import Counter, namedtuple
+import metrics
+from library_item import LibraryItemAlbum
+from library_index import FieldIndexes, SearchIndex
+from media_store import MediaStore
+from play_history import PlayHistory
+from save_worker import SaveWorker
+from track_columns import TrackColumnMap
+from track_query import QueryEngine, select_sorted, sort_value
+from track_storage import CsvTrackStorage, item_to_row, make_item, normalize_row
+
+# kind is "added", "removed", "updated" (fields names what changed) or "reloaded"
+LibraryEvent = namedtuple("LibraryEvent", ["kind", "key", "fields", "version"])
 
 class TrackLibrary:
-    def __init__(self, track_csv="tracks.csv", img_folder="track_images", sound_folder="track_sounds"):
+    def __init__(self, track_csv="tracks.csv", img_folder="track_images", sound_folder="track_sounds",
+                 use_journal=False, compact_threshold=1000,
+                 write_behind=False, flush_interval=5.0, flush_threshold=50, storage=None, lazy_load=False,
+                 use_snapshot=True, play_history=False):
         self.track_csv = track_csv
         self.img_folder = img_folder
         self.sound_folder = sound_folder
         self.library = {}
+
+        # Covers and audio are stored once per distinct file and hard-linked per track
+        self.images = MediaStore(img_folder, ".jpg")
+        self.sounds = MediaStore(sound_folder, ".mp3")
+
+        # Where tracks are persisted; the default keeps them in track_csv, optionally
+        # with an append-only journal and lazily parsed rows, and loads them from a
+        # binary snapshot of the CSV when one is current (see track_storage).
+        self.storage = storage or CsvTrackStorage(track_csv, use_journal, compact_threshold, lazy_load, use_snapshot)
+        # Held while self.library changes; storage takes it to copy the library for a
+        # save on another thread, so the copy never sees a change half made
+        self._lock = threading.RLock()
+        self.storage.library_lock = self._lock
+
+        # Write-behind mode: changes are coalesced per track in memory and written
+        # by flush(), which runs on the save worker thread after flush_interval
+        # seconds or once flush_threshold changes are pending, and on close().
+        self.write_behind = write_behind
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self._dirty = {}
+        self._removed = {}              # key -> re-added since, for keys removed before the next flush
+        self._flush_lock = threading.Lock()
+        self._flush_timer = None
+        self.pending_writes = 0
+        self.flushed_writes = 0
+        self.flush_count = 0
+        self._saver = None              # SaveWorker, started by the first background save
+        self._save_listeners = []
+
+        # In-memory indexes, built from a full scan the first time a query needs them
+        # and kept current by every mutation afterwards.
+        self._search_index = None
+        self._field_indexes = None
+        self._query_engine = None
+
+        # play_history: every play is also logged with its time to <track_csv>.plays,
+        # for "most played in the last N days" (see play_history)
+        self.history = PlayHistory(track_csv + ".plays") if play_history else None
+
+        # Change notifications: every mutation bumps version and is published to subscribers
+        self.version = 0
+        self._listeners = []
+
         self.load_library_from_csv()
 
     def load_library_from_csv(self):
-        self.library = {}
-        if not os.path.exists(self.track_csv):
+        with metrics.timer("library.load"):
+            self.library = self.storage.load()
+        self._search_index = None
+        self._field_indexes = None
+        self._publish("reloaded")
+    def save_library_to_csv(self, background=False):
+        # Full rewrite of the storage; in the background the caller returns at once
+        # and subscribe_saves() listeners hear when it is on disk
+        if background:
+            self._get_saver().submit(self.save_library_to_csv)
             return
-        with open(self.track_csv, mode="r", encoding="utf-8") as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                track_id = row["track_id"]
-                name = row["name"]
-                artist = row["artist"]
-                rating = int(row["rating"])
-                plays = int(row["plays"])
-                album = row.get("album", "").strip()
-                year_raw = row.get("year", "").strip()
-                year = int(year_raw) if year_raw.isdigit() else None
-
-                if album and year:
-                    item = LibraryItemAlbum(name, artist, rating, album, year)
-                else:
-                    item = LibraryItem(name, artist, rating)
-
-                item.play_count = plays
-                self.library[track_id] = item
-    def save_library_to_csv(self):
-        with open(self.track_csv, mode="w", encoding="utf-8", newline="") as file:
-            fieldnames = ["track_id", "name", "artist", "rating", "plays", "album", "year"]
-            writer = csv.DictWriter(file, fieldnames=fieldnames)
-            writer.writeheader()
-            for key, item in self.library.items():
-                writer.writerow({
-                    "track_id": key,
-                    "name": item.name,
-                    "artist": item.artist,
-                    "rating": item.rating,
-                    "plays": item.play_count,
-                    "album": getattr(item, "album", ""),
-                    "year": getattr(item, "year", "")
-                })
+        self.flush()
+        with metrics.timer("library.save"):
+            self.storage.save_all(self.library)
     def add_track(self, track_id, name, artist, rating, album="", year=None, image_path=None, audio_path=None):
         if track_id in self.library:
             return False, "Track ID already exists."
 
-        if album and year:
-            item = LibraryItemAlbum(name, artist, rating, album, year)
+        with self._lock:
+            self.library[track_id] = make_item(name, artist, rating, album, year)
+            self._reindex(track_id)
+        self._commit("put", track_id)
+        self._publish("added", track_id)
+
+        self.set_media(track_id, image_path, audio_path)
+        return True, "Track added successfully."
+    def update_track(self, track_id, name=None, artist=None, rating=None, album=None, year=None):
+        item = self.get_item(track_id)
+        if not item:
+            return False, "Track ID not found."
+        before = normalize_row(item_to_row(track_id, item))
+
+        name = name or item.name
+        artist = artist or item.artist
+        rating = item.rating if rating is None else rating
+        album = album or getattr(item, "album", "")
+        year = year or getattr(item, "year", None)
+
+        # A plain item becomes an album item as soon as album or year is given
+        if not isinstance(item, LibraryItemAlbum) and (album or year):
+            new_item = LibraryItemAlbum(name, artist, rating, album, year or 0)
         else:
-            item = LibraryItem(name, artist, rating)
+            new_item = make_item(name, artist, rating, album, year)
+        new_item.play_count = item.play_count
 
-        self.library[track_id] = item
-        self.save_library_to_csv()
+        with self._lock:
+            self.library[track_id] = new_item
+            self._reindex(track_id)
+        self._commit("put", track_id)
+        after = normalize_row(item_to_row(track_id, new_item))
+        self._publish("updated", track_id, {field for field in after if after[field] != before[field]})
+        return True, "Track updated successfully."
+    def remove_track(self, track_id):
+        if track_id not in self.library:
+            return False, "Track ID not found."
+        with self._lock:
+            del self.library[track_id]
+            self._unindex(track_id)
+        self._commit("remove", track_id)
+        self._publish("removed", track_id)
 
+        # Remove files; shared media stays until its last track is gone
+        self.images.remove(track_id)
+        self.sounds.remove(track_id)
+        return True, "Track removed."
+    def set_media(self, track_id, image_path=None, audio_path=None):
         # Copy image
         if image_path:
-            dest_img = os.path.join(self.img_folder, f"{track_id}.jpg")
             try:
-                shutil.copy(image_path, dest_img)
+                self.images.put(track_id, image_path)
             except Exception as e:
                 print(f"Image copy failed: {e}")
 
         # Copy audio
         if audio_path:
-            dest_audio = os.path.join(self.sound_folder, f"{track_id}.mp3")
             try:
-                shutil.copy(audio_path, dest_audio)
+                self.sounds.put(track_id, audio_path)
             except Exception as e:
                 print(f"Audio copy failed: {e}")
+    def add_tracks(self, tracks):
+        # Bulk add of (track_id, name, artist, rating, album, year) tuples, written to
+        # storage in one go. Ids already in the library are skipped; returns the added ids.
+        added = []
+        with self._lock:
+            for track_id, name, artist, rating, album, year in tracks:
+                if track_id in self.library:
+                    continue
+                self.library[track_id] = make_item(name, artist, rating, album, year)
+                self._reindex(track_id)
+                added.append(track_id)
 
-        return True, "Track added successfully."
-    def remove_track(self, track_id):
-        if track_id not in self.library:
-            return False, "Track ID not found."
-        del self.library[track_id]
-        self.save_library_to_csv()
-
-        # Remove files
-        img = os.path.join(self.img_folder, f"{track_id}.jpg")
-        aud = os.path.join(self.sound_folder, f"{track_id}.mp3")
-        if os.path.exists(img): os.remove(img)
-        if os.path.exists(aud): os.remove(aud)
-        return True, "Track removed."
+        if added:
+            self._commit_all([("put", key, None) for key in added])
+            for key in added:
+                self._publish("added", key)
+        return added
+
+    # --- Indexes ---
+
+    def _reindex(self, key):
+        item = self.library[key]
+        if self._search_index is not None:
+            self._search_index.add(key, item.name, item.artist)
+        if self._field_indexes is not None:
+            self._field_indexes.add(key, item.artist, item.rating, item.play_count)
+    def _unindex(self, key):
+        if self._search_index is not None:
+            self._search_index.remove(key)
+        if self._field_indexes is not None:
+            self._field_indexes.remove(key)
+    def _get_search_index(self):
+        if self._search_index is None:
+            index = SearchIndex()
+            for row in self.iter_rows():
+                index.add(row["track_id"], row["name"], row["artist"])
+            self._search_index = index
+        return self._search_index
+    def _get_field_indexes(self):
+        if self._field_indexes is None:
+            indexes = FieldIndexes()
+            indexes.add_all((row["track_id"], row["artist"], row["rating"], row["plays"]) for row in self.iter_rows())
+            self._field_indexes = indexes
+        return self._field_indexes
+
+    # --- Change Notifications ---
+
+    def subscribe(self, callback):
+        self._listeners.append(callback)
+    def unsubscribe(self, callback):
+        self._listeners.remove(callback)
+    def _publish(self, kind, key=None, fields=None):
+        with self._lock:
+            self.version += 1
+            event = LibraryEvent(kind, key, fields, self.version)
+        for callback in list(self._listeners):
+            callback(event)
+
+    # --- Write-behind ---
+
+    def _commit(self, op, key, fields=None):
+        metrics.count("library.mutations")
+        if not self.write_behind:
+            self.storage.write_changes([(op, key, fields)], self.library)
+            return
+
+        with self._lock:
+            self._mark_dirty(op, key, fields)
+            self.pending_writes += 1
+            due = self.pending_writes >= self.flush_threshold
+            if not due and self._flush_timer is None:
+                self._flush_timer = threading.Timer(self.flush_interval, self._flush_in_background)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+        if due:
+            self._flush_in_background()
+    def _commit_all(self, changes):
+        # A batch of structural changes as a single storage write
+        metrics.count("library.mutations", len(changes))
+        if self.write_behind:
+            with self._lock:
+                for op, key, fields in changes:
+                    self._mark_dirty(op, key, fields)
+                self.pending_writes += len(changes)
+            self._flush_in_background()
+        else:
+            self.storage.write_changes(changes, self.library)
+    def _mark_dirty(self, op, key, fields):
+        # Coalesces one change into _dirty; called with _lock held
+        if op == "set":
+            if self._dirty.get(key) is not None:
+                self._dirty[key].update(fields)
+            elif key not in self._dirty:
+                self._dirty[key] = set(fields)
+            return
+        if op == "remove":
+            self._removed[key] = False
+        elif self._removed.get(key) is False:
+            # Re-added after a remove: the library moved it to the end, so its
+            # remove and put are written after every change queued before
+            self._removed[key] = True
+            self._dirty.pop(key, None)
+        self._dirty[key] = None  # structural change, write the whole row
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                if self._flush_timer is not None:
+                    self._flush_timer.cancel()
+                    self._flush_timer = None
+                if not self._dirty:
+                    return
+
+                changes = []
+                for key, fields in self._dirty.items():
+                    item = self.library.get(key)
+                    if item is None:
+                        changes.append(("remove", key, None))
+                    elif fields is None:
+                        if key in self._removed:
+                            changes.append(("remove", key, None))  # the put goes to the end, not the old place
+                        changes.append(("put", key, None))
+                    else:
+                        values = {"plays": item.play_count, "rating": item.rating}
+                        changes.append(("set", key, {field: values[field] for field in fields}))
+                self._dirty = {}
+                self._removed = {}
+                flushed, self.pending_writes = self.pending_writes, 0
+
+            # Written outside _lock so plays keep counting while the disk is busy
+            with metrics.timer("library.flush"):
+                self.storage.write_changes(changes, self.library)
+            metrics.count("library.flushed_changes", len(changes))
+            with self._lock:
+                self.flushed_writes += flushed
+                self.flush_count += 1
+    def _flush_in_background(self):
+        self._get_saver().submit(self.flush)
+    def _get_saver(self):
+        with self._lock:
+            if self._saver is None:
+                self._saver = SaveWorker("library-save")
+                self._saver.subscribe(self._saved)
+            return self._saver
+    def _saved(self, event):
+        for callback in list(self._save_listeners):
+            callback(event)
+    def subscribe_saves(self, callback):
+        # callback(SaveEvent) on the save worker thread after every background save
+        self._save_listeners.append(callback)
+    def unsubscribe_saves(self, callback):
+        self._save_listeners.remove(callback)
+    def wait_for_saves(self, timeout=None):
+        return self._saver is None or self._saver.wait(timeout)
+    def saving(self):
+        return self._saver is not None and self._saver.busy()
+    def write_stats(self):
+        with self._lock:
+            return {
+                "pending_writes": self.pending_writes,
+                "dirty_tracks": len(self._dirty),
+                "flushed_writes": self.flushed_writes,
+                "flushes": self.flush_count
+            }
+    def compact(self, background=False):
+        self.flush()
+        self.storage.compact(self.library, background)
+    def close(self):
+        if self._saver is not None:
+            self._saver.close()  # finishes queued saves first
+        self.flush()
+        self.storage.close()
+        if self.history is not None:
+            self.history.close()
 
     # --- Accessor Methods ---
 
     def get_keys(self):
         return list(self.library.keys())
+    def has_track(self, key):
+        return key in self.library
     def get_item(self, key):
         return self.library.get(key)
     def get_name(self, key):
@@ -113,13 +347,140 @@ class TrackLibrary:
     def increment_play_count(self, key):
         item = self.get_item(key)
         if item:
-            item.play_count += 1
-            self.save_library_to_csv()
+            with self._lock:
+                item.play_count += 1
+                self._reindex(key)
+            self._commit("set", key, {"plays": item.play_count})
+            if self.history is not None:
+                self.history.record(key)
+            self._publish("updated", key, {"plays"})
     def set_rating(self, key, rating):
         item = self.get_item(key)
         if item:
-            item.rating = rating
-            self.save_library_to_csv()
+            with self._lock:
+                item.rating = rating
+                self._reindex(key)
+            self._commit("set", key, {"rating": rating})
+            self._publish("updated", key, {"rating"})
+
+    # --- Queries ---
+    # Backends with indexes answer these directly; otherwise the library is scanned.
+
+    def _storage_query(self, name, *args):
+        if not self.storage.indexed_queries:
+            return None
+        if self._dirty:
+            self.flush()  # the backend must see pending changes before it is queried
+        return getattr(self.storage, name)(*args)
+    def iter_rows(self):
+        # Full scan as plain row dicts, without building an item for every track
+        if self.storage.indexed_queries and self._dirty:
+            self.flush()
+        return self.storage.iter_rows(self.library)
+    def search(self, query):
+        with metrics.timer("library.search"):
+            query = query.strip().lower()
+            keys = self._storage_query("search", query)
+            if keys is not None:
+                return keys
+            if not query:
+                return self.get_keys()
+            return self._get_search_index().search(query)
+    def find_by_artist(self, artist):
+        with metrics.timer("library.filter"):
+            keys = self._storage_query("find_by_artist", artist)
+            if keys is not None:
+                return keys
+            return self._get_field_indexes().find_by_artist(artist)
+    def find_by_rating(self, rating):
+        with metrics.timer("library.filter"):
+            keys = self._storage_query("find_by_rating", rating)
+            if keys is not None:
+                return keys
+            if self._field_indexes is None and isinstance(self.library, TrackColumnMap):
+                # One pass over the rating column beats building every index for one filter
+                with self._lock:
+                    return self.library.keys_with_rating(rating)
+            return self._get_field_indexes().find_by_rating(rating)
+    def find_by_play_range(self, low, high=None):
+        with metrics.timer("library.filter"):
+            keys = self._storage_query("find_by_play_range", low, high)
+            if keys is not None:
+                return keys
+            if self._field_indexes is None and isinstance(self.library, TrackColumnMap):
+                with self._lock:
+                    return self.library.keys_in_play_range(low, high)
+            return self._get_field_indexes().find_by_play_range(low, high)
+    def get_artists(self):
+        artists = self._storage_query("get_artists")
+        if artists is not None:
+            return artists
+        return self._get_field_indexes().get_artists()
+    def artist_counts(self):
+        return self._get_field_indexes().artist_counts()
+    def sorted_keys(self, field, descending=False, start=0, stop=None):
+        # Track ids ordered by field (ties in library order), sliced [start:stop].
+        # Plays and rating read maintained orderings; other fields use heap selection.
+        if field == "plays":
+            return self._get_field_indexes().keys_by_plays(descending, start, stop)
+        if field == "rating":
+            return self._get_field_indexes().keys_by_rating(descending, start, stop)
+        pairs = ((row["track_id"], sort_value(field, row[field])) for row in self.iter_rows())
+        return select_sorted(pairs, descending, stop)[start:]
+    def top(self, field, count, descending=True):
+        # e.g. top("plays", 20): the 20 most played tracks
+        return self.sorted_keys(field, descending, 0, count)
+    def play_buckets(self, count=4):
+        return self._get_field_indexes().play_buckets(count)
+    def query(self, query):
+        # Runs a track_query.Query: AND/OR of conditions, sort and limit, with cached results
+        with metrics.timer("library.query"):
+            if self._query_engine is None:
+                self._query_engine = QueryEngine(self)
+            return self._query_engine.run(query)
+    def recent_plays(self, days):
+        # Counter of plays per track over today and the days - 1 before it; empty without play_history
+        if self.history is None:
+            return Counter()
+        return self.history.plays_in_last_days(days)
+    def top_recent(self, days, count=10):
+        # [(track_id, plays)], most played in the last `days` days first
+        plays = self.recent_plays(days)
+        return [(key, plays[key]) for key, _ in plays.most_common() if key in self.library][:count]
 
+class ChangeTracker:
+    # Collects library events for a view until it is ready to apply them, so a tab can
+    # patch just the affected rows (or do nothing) instead of rebuilding everything.
+    # Events may arrive from any thread; take() is called from the consumer's own thread.
+    def __init__(self, lib):
+        self.lib = lib
+        self.version = lib.version
+        self._latest = lib.version   # newest event received, which take() catches up to
+        self._lock = threading.Lock()
+        self._updated = set()
+        self._structural = {}        # ordered, so added tracks keep library order
+        self._reloaded = False
+        lib.subscribe(self._on_event)
 
+    def _on_event(self, event):
+        with self._lock:
+            self._latest = max(self._latest, event.version)
+            if event.kind == "reloaded":
+                self._reloaded = True
+            elif event.kind == "updated":
+                self._updated.add(event.key)
+            else:
+                self._structural[event.key] = None
+    def changed(self):
+        return self.lib.version != self.version
+    def take(self):
+        # Returns (updated keys, added-or-removed keys, whether the library was reloaded)
+        with self._lock:
+            self.version = self._latest
+            changes = (self._updated, list(self._structural), self._reloaded)
+            self._updated, self._structural, self._reloaded = set(), {}, False
+        return changes
 
+if __name__ == "__main__":
+    from library_cli import main  # python -m track_library: the headless command line
+    raise SystemExit(main())
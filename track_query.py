@@ -0,0 +1,237 @@
+#track_query.py
+import heapq
+from collections import OrderedDict, namedtuple
+import metrics
+from track_storage import item_to_row, normalize_row
+
+def parse_range(text):
+    # "11-20" -> (11, 20), "51+" -> (51, None), "7" -> (7, 7)
+    text = text.strip()
+    if text.endswith("+"):
+        return int(text[:-1]), None
+    low, _, high = text.partition("-")
+    return int(low), int(high or low)
+
+# --- Conditions ---
+# Every condition can test a row dict (matches). Those marked indexed can also be
+# answered from the library's indexes with lookup(lib), which returns a set of ids.
+
+class Ids(namedtuple("Ids", ["keys"])):
+    __slots__ = ()
+    indexed = True
+
+    def __new__(cls, keys):
+        return super().__new__(cls, frozenset(keys))
+    def lookup(self, lib):
+        return {key for key in self.keys if lib.has_track(key)}
+    def matches(self, row):
+        return row["track_id"] in self.keys
+
+class Text(namedtuple("Text", ["query"])):
+    # Case-insensitive substring of the name or artist, like TrackLibrary.search
+    __slots__ = ()
+    indexed = True
+
+    def lookup(self, lib):
+        return set(lib.search(self.query))
+    def matches(self, row):
+        query = self.query.strip().lower()
+        return query in row["name"].lower() or query in row["artist"].lower()
+
+class Artist(namedtuple("Artist", ["name"])):
+    __slots__ = ()
+    indexed = True
+
+    def lookup(self, lib):
+        return set(lib.find_by_artist(self.name))
+    def matches(self, row):
+        return row["artist"].lower() == self.name.lower()
+
+class Rating(namedtuple("Rating", ["low", "high"])):
+    # Inclusive range; Rating(4) is exactly 4
+    __slots__ = ()
+    indexed = True
+
+    def __new__(cls, low, high=None):
+        return super().__new__(cls, low, low if high is None else high)
+    def lookup(self, lib):
+        keys = set()
+        for rating in range(self.low, self.high + 1):
+            keys.update(lib.find_by_rating(rating))
+        return keys
+    def matches(self, row):
+        return self.low <= row["rating"] <= self.high
+
+class Plays(namedtuple("Plays", ["low", "high"])):
+    # Inclusive range; high=None is open-ended
+    __slots__ = ()
+    indexed = True
+
+    def __new__(cls, low, high=None):
+        return super().__new__(cls, low, high)
+    @classmethod
+    def parse(cls, text):
+        return cls(*parse_range(text))
+    def lookup(self, lib):
+        return set(lib.find_by_play_range(self.low, self.high))
+    def matches(self, row):
+        return row["plays"] >= self.low and (self.high is None or row["plays"] <= self.high)
+
+class Album(namedtuple("Album", ["name"])):
+    __slots__ = ()
+    indexed = False
+
+    def matches(self, row):
+        return row["album"].lower() == self.name.lower()
+
+class Year(namedtuple("Year", ["low", "high"])):
+    # Inclusive range; tracks without a year never match
+    __slots__ = ()
+    indexed = False
+
+    def __new__(cls, low, high=None):
+        return super().__new__(cls, low, low if high is None else high)
+    def matches(self, row):
+        return row["year"] is not None and self.low <= row["year"] <= self.high
+
+class All(namedtuple("All", ["parts"])):
+    # AND: indexed when any part is, the other parts are checked on its candidates
+    __slots__ = ()
+
+    def __new__(cls, *parts):
+        return super().__new__(cls, tuple(parts))
+    @property
+    def indexed(self):
+        return any(part.indexed for part in self.parts)
+    def matches(self, row):
+        return all(part.matches(row) for part in self.parts)
+
+class Any(namedtuple("Any", ["parts"])):
+    # OR: indexed only when every part is, otherwise answered by a scan
+    __slots__ = ()
+
+    def __new__(cls, *parts):
+        return super().__new__(cls, tuple(parts))
+    @property
+    def indexed(self):
+        return all(part.indexed for part in self.parts)
+    def matches(self, row):
+        return any(part.matches(row) for part in self.parts)
+
+# where=None matches every track; sort is one of SORT_FIELDS or None for library order;
+# offset and limit select a page of the result
+Query = namedtuple("Query", ["where", "sort", "descending", "limit", "offset"],
+                   defaults=(None, None, False, None, 0))
+
+SORT_FIELDS = ("track_id", "name", "artist", "rating", "plays", "album", "year")
+
+def sort_value(field, value):
+    return value.lower() if field in ("name", "artist", "album") else value
+def select_sorted(pairs, descending=False, stop=None):
+    # Keys of (key, value) pairs ordered by value, ties in input order and None values
+    # last. With stop only the first `stop` are wanted, picked by heap selection.
+    if descending:
+        order = lambda pair: (pair[1] is not None, pair[1])
+        picked = sorted(pairs, key=order, reverse=True) if stop is None else heapq.nlargest(stop, pairs, key=order)
+    else:
+        order = lambda pair: (pair[1] is None, pair[1])
+        picked = sorted(pairs, key=order) if stop is None else heapq.nsmallest(stop, pairs, key=order)
+    return [key for key, _ in picked]
+
+# --- Filter controls shared by the tabs ---
+
+FILTER_TYPES = ["Artist", "Rating", "Play Count"]
+
+def filter_choices(lib, filter_type):
+    if filter_type == "Artist":
+        return lib.get_artists()
+    if filter_type == "Rating":
+        return [str(i) for i in range(6)]
+    if filter_type == "Play Count":
+        return lib.play_buckets()
+    return []
+def filter_condition(filter_type, value):
+    # Condition for a filter dropdown selection, or None when nothing is selected
+    value = value.strip()
+    if not value:
+        return None
+    if filter_type == "Artist":
+        return Artist(value)
+    if filter_type == "Rating":
+        return Rating(int(value))
+    if filter_type == "Play Count":
+        return Plays.parse(value)
+    return None
+
+# --- Engine ---
+
+class QueryEngine:
+    # Runs Query objects against a TrackLibrary. Indexed conditions are looked up and
+    # intersected smallest first; the rest are only tested on the surviving candidates,
+    # or in one streaming scan when nothing indexed narrows the query. Results are kept
+    # in an LRU cache that is emptied whenever the library version moves.
+    def __init__(self, lib, cache_size=64):
+        self.lib = lib
+        self.cache_size = cache_size
+        self._cache = OrderedDict()     # Query -> tuple of track_ids
+        self._version = lib.version
+        self._positions = None          # track_id -> library position, until tracks are added or removed
+        lib.subscribe(self._on_event)
+
+    def run(self, query):
+        if self._version != self.lib.version:
+            self._cache.clear()
+            self._version = self.lib.version
+        cached = self._cache.get(query)
+        if cached is not None:
+            self._cache.move_to_end(query)
+            metrics.count("query.cache_hits")
+            return list(cached)
+
+        metrics.count("query.cache_misses")
+        keys = self._execute(query)
+        self._cache[query] = tuple(keys)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return keys
+
+    def _on_event(self, event):
+        if event.kind != "updated":
+            self._positions = None
+    def _execute(self, query):
+        stop = None if query.limit is None else query.offset + query.limit
+        if query.where is None and query.sort is not None:
+            # Whole-library orderings come from the library's maintained orders or a heap
+            return self.lib.sorted_keys(query.sort, query.descending, query.offset, stop)
+
+        matched = self._evaluate(query.where)
+        if matched is None:
+            keys = self.lib.get_keys()
+        else:
+            keys = self._in_library_order(matched)
+        if query.sort is not None:
+            pairs = [(key, sort_value(query.sort, self._row(key)[query.sort])) for key in keys]
+            keys = select_sorted(pairs, query.descending, stop)
+        return keys[query.offset:stop]
+    def _evaluate(self, condition):
+        # Set of matching track_ids, or None for every track
+        if condition is None:
+            return None
+        if not condition.indexed:
+            return {row["track_id"] for row in self.lib.iter_rows() if condition.matches(row)}
+        if isinstance(condition, All):
+            found = sorted((self._evaluate(part) for part in condition.parts if part.indexed), key=len)
+            keys = found[0].intersection(*found[1:])
+            rest = [part for part in condition.parts if not part.indexed]
+            if rest:
+                keys = {key for key in keys if all(part.matches(self._row(key)) for part in rest)}
+            return keys
+        if isinstance(condition, Any):
+            return set().union(*(self._evaluate(part) for part in condition.parts))
+        return condition.lookup(self.lib)
+    def _row(self, key):
+        return normalize_row(item_to_row(key, self.lib.get_item(key)))
+    def _in_library_order(self, keys):
+        if self._positions is None:
+            self._positions = {key: position for position, key in enumerate(self.lib.get_keys())}
+        return sorted(keys, key=self._positions.__getitem__)
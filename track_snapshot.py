@@ -0,0 +1,87 @@
+#track_snapshot.py
+import mmap
+import os
+import struct
+import sys
+from array import array
+from track_columns import TrackColumnMap
+
+# Binary copy of tracks.csv for fast startup. The CSV stays the file people edit and
+# exchange; this one is rebuilt from it whenever it no longer matches.
+#
+# Layout: header, then a string table (every distinct id, name, artist and album,
+# UTF-8, separated by NUL), then the columns for `tracks` rows in TrackColumnMap's
+# typecodes: id/name/artist/album string numbers ("I"), plays ("q"), year ("i"),
+# rating ("i"). Numbers are in the writer's byte order, recorded in the header.
+MAGIC = b"JBXSNAP\0"
+VERSION = 2
+HEADER = struct.Struct("<8sHH4xqqQQQ")  # magic, version, little-endian, csv size, csv mtime_ns, tracks, strings, table bytes
+COLUMNS = ("I", "I", "I", "I", "q", "i", "i")
+
+def csv_stamp(stat):
+    # What a snapshot records about the CSV it was made from
+    return stat.st_size, stat.st_mtime_ns
+
+def write_snapshot(file, columns, stamp):
+    # Writes a TrackColumnMap to an open binary file; False (nothing written) when a
+    # string holds a NUL, which the table cannot represent
+    rows = [row for row, key in enumerate(columns.keys_by_row) if key is not None]
+    table = {}
+    def numbers(values):
+        return array("I", [table.setdefault(values[row], len(table)) for row in rows])
+    refs = [numbers(values) for values in (columns.keys_by_row, columns.names, columns.artists, columns.albums)]
+    if any("\0" in text for text in table):
+        return False
+    if len(rows) == len(columns.keys_by_row):
+        numeric = [columns.plays, columns.years, columns.ratings]
+    else:
+        numeric = [array(values.typecode, [values[row] for row in rows])
+                   for values in (columns.plays, columns.years, columns.ratings)]
+
+    strings = "\0".join(table).encode("utf-8")
+    file.write(HEADER.pack(MAGIC, VERSION, sys.byteorder == "little", *stamp, len(rows), len(table), len(strings)))
+    file.write(strings)
+    for values in refs + numeric:
+        file.write(values.tobytes())
+    return True
+
+def read_snapshot(path, stamp):
+    # TrackColumnMap from the snapshot at path, or None when it is missing, from
+    # another version or byte order, damaged, or made from a different CSV
+    try:
+        file = open(path, mode="rb")
+    except OSError:
+        return None
+    with file:
+        size = os.fstat(file.fileno()).st_size
+        if size < HEADER.size:
+            return None
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            magic, version, little, csv_size, csv_mtime, tracks, count, table_size = HEADER.unpack_from(view, 0)
+            if (magic, version, bool(little)) != (MAGIC, VERSION, sys.byteorder == "little"):
+                return None
+            if (csv_size, csv_mtime) != stamp:
+                return None
+            if size != HEADER.size + table_size + tracks * sum(array(code).itemsize for code in COLUMNS):
+                return None
+
+            offset = HEADER.size + table_size
+            try:
+                texts = view[HEADER.size:offset].decode("utf-8").split("\0") if count else []
+            except UnicodeDecodeError:
+                return None
+            if len(texts) != count:
+                return None
+            columns = []
+            for code in COLUMNS:
+                values = array(code)
+                end = offset + tracks * values.itemsize
+                values.frombytes(view[offset:end])
+                columns.append(values)
+                offset = end
+
+    if any(refs and max(refs) >= count for refs in columns[:4]):
+        return None
+    keys, names, artists, albums = (list(map(texts.__getitem__, refs)) for refs in columns[:4])
+    plays, years, ratings = columns[4:]
+    return TrackColumnMap.from_columns(keys, names, artists, albums, ratings, plays, years)
@@ -0,0 +1,617 @@
+#track_storage.py
+import csv
+import io
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections.abc import MutableMapping
+from contextlib import nullcontext
+from library_item import LibraryItem, LibraryItemAlbum
+from track_columns import TrackColumnMap
+from track_snapshot import csv_stamp, read_snapshot, write_snapshot
+
+FIELDNAMES = ["track_id", "name", "artist", "rating", "plays", "album", "year"]
+
+def make_item(name, artist, rating, album="", year=None, plays=0):
+    if album and year:
+        item = LibraryItemAlbum(name, artist, rating, album, year)
+    else:
+        item = LibraryItem(name, artist, rating)
+    item.play_count = plays
+    return item
+
+def row_to_item(row):
+    album = (row.get("album") or "").strip()
+    year_raw = str(row.get("year") or "").strip()
+    year = int(year_raw) if year_raw.isdigit() else None
+    return make_item(row["name"], row["artist"], int(row["rating"]), album, year, int(row["plays"]))
+
+def normalize_row(row):
+    album = (row.get("album") or "").strip()
+    year_raw = str(row.get("year") or "").strip()
+    return {
+        "track_id": row["track_id"],
+        "name": row["name"],
+        "artist": row["artist"],
+        "rating": int(row["rating"]),
+        "plays": int(row["plays"]),
+        "album": album,
+        "year": int(year_raw) if year_raw.isdigit() else None
+    }
+
+def item_to_row(key, item):
+    return {
+        "track_id": key,
+        "name": item.name,
+        "artist": item.artist,
+        "rating": item.rating,
+        "plays": item.play_count,
+        "album": getattr(item, "album", ""),
+        "year": getattr(item, "year", "")
+    }
+
+def sync_file(file):
+    file.flush()
+    os.fsync(file.fileno())
+def replace_file(tmp_path, path):
+    # Rename a temp file, already written and sync_file()d, over path and sync the
+    # folder, so after a crash path holds either the old contents or the new ones
+    os.replace(tmp_path, path)
+    if os.name != "nt":  # folders cannot be opened (or fsynced) on Windows
+        folder = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+        try:
+            os.fsync(folder)
+        finally:
+            os.close(folder)
+
+class LazyTrackMap(MutableMapping):
+    # Ordered track_id -> item mapping that only builds an item the first time it is
+    # read. Each id keeps a locator (a file offset, or None) that fetch() turns into an item.
+    def __init__(self, locators, fetch):
+        self._locators = locators
+        self._items = {}
+        self._fetch = fetch
+
+    def __getitem__(self, key):
+        item = self._items.get(key)
+        if item is None:
+            item = self._fetch(key, self._locators[key])
+            self._items[key] = item
+        return item
+    def __setitem__(self, key, item):
+        self._locators.setdefault(key, None)
+        self._items[key] = item
+    def __delitem__(self, key):
+        del self._locators[key]
+        self._items.pop(key, None)
+    def __contains__(self, key):
+        return key in self._locators
+    def __iter__(self):
+        return iter(self._locators)
+    def __len__(self):
+        return len(self._locators)
+    def get(self, key, default=None):
+        return self[key] if key in self._locators else default
+
+    def loaded(self, key):
+        return self._items.get(key)
+    def snapshot(self):
+        return [(key, self._items.get(key), locator) for key, locator in list(self._locators.items())]
+    def relocate(self, locators):
+        for key, locator in locators.items():
+            if key in self._locators:
+                self._locators[key] = locator
+
+class TrackStorage:
+    # Backend interface used by TrackLibrary. Query methods return None when the
+    # backend has nothing better than a scan, and the library falls back to memory.
+    indexed_queries = False
+    # TrackLibrary replaces this with the lock it holds while changing the library;
+    # anything that walks the whole library takes it to copy what it needs first
+    library_lock = nullcontext()
+
+    def load(self):
+        return {}
+    def save_all(self, library):
+        pass
+    def write_changes(self, changes, library):
+        self.save_all(library)
+    def compact(self, library, background=False):
+        pass
+    def close(self):
+        pass
+    def iter_rows(self, library):
+        with self.library_lock:
+            entries = list(library.items())
+        for key, item in entries:
+            yield normalize_row(item_to_row(key, item))
+
+    def search(self, query):
+        return None
+    def find_by_artist(self, artist):
+        return None
+    def find_by_rating(self, rating):
+        return None
+    def find_by_play_range(self, low, high=None):
+        return None
+    def get_artists(self):
+        return None
+
+class CsvTrackStorage(TrackStorage):
+    def __init__(self, track_csv="tracks.csv", use_journal=False, compact_threshold=1000, lazy=False,
+                 use_snapshot=True):
+        self.track_csv = track_csv
+
+        # Lazy mode: load() only records where each row starts in the file and items
+        # are parsed the first time they are read.
+        self.lazy = lazy
+        self._fieldnames = FIELDNAMES
+
+        # Journal mode: changes are appended to <track_csv>.journal and folded
+        # back into the CSV by compact() instead of rewriting it on every change.
+        self.use_journal = use_journal
+        self.journal_file = track_csv + ".journal"
+        self.compact_threshold = compact_threshold
+        self._lock = threading.RLock()
+        self._save_lock = threading.Lock()
+        self._journal = None
+        self._journal_entries = 0
+        self._compacting = False
+
+        # Snapshot: a binary copy of the CSV in <track_csv>.snap (see track_snapshot),
+        # loaded instead of the CSV while it matches the CSV's size and mtime. It is
+        # rewritten by every save of a column library and rebuilt on a thread otherwise.
+        self.use_snapshot = use_snapshot
+        self.snapshot_file = track_csv + ".snap"
+        self._snapshot_lock = threading.Lock()
+        self._snapshot_thread = None   # the rebuild after a load from the CSV, joined by close()
+        self._csv_stamp = None   # csv_stamp() of the CSV as last read or written
+
+    def load(self):
+        self._sweep_snapshot_files()
+        library = self._read_snapshot()
+        current = library is not None   # a snapshot that matches the CSV
+        if library is None:
+            library = self._index_csv() if self.lazy else self._read_csv()
+
+        # Replay changes that were journaled but not yet compacted, then fold them
+        # into the CSV so the journal always starts empty.
+        if self._replay_journal(library):
+            self.save_all(library)
+            current = isinstance(library, TrackColumnMap)  # only a column save writes the snapshot
+        # Rebuilt from the CSV as it is now, after any replay has rewritten it
+        if not current:
+            self._rebuild_snapshot(library)
+        return library
+    def save_all(self, library):
+        with self._save_lock:
+            # The file is written from a private copy, so the library may change (on
+            # any thread) while it is being written; a column library copies quickly
+            columns = None
+            with self.library_lock, self._lock:
+                if isinstance(library, LazyTrackMap):
+                    entries = library.snapshot()
+                elif isinstance(library, TrackColumnMap):
+                    columns = library.copy()
+                else:
+                    entries = [(key, item, None) for key, item in library.items()]
+                covered = self._journal_entries
+            if columns is not None:
+                entries = [(key, item, None) for key, item in columns.items()]
+
+            # Rows never read are copied from the old file as raw bytes, so saving a
+            # lazily loaded library does not build an item for every track.
+            tmp_path = self.track_csv + ".tmp"
+            locators = {}
+            source = open(self.track_csv, mode="rb") if any(item is None for _, item, _ in entries) else None
+            try:
+                with open(tmp_path, mode="wb") as file:
+                    offset = file.write(self._encode_row(FIELDNAMES))
+                    for key, item, locator in entries:
+                        if item is None:
+                            raw = self._read_record(source, locator)
+                            if self._fieldnames != FIELDNAMES or not raw.endswith(b"\n"):
+                                row = normalize_row(self._parse_record(raw))
+                                raw = self._encode_row(["" if row[field] is None else row[field] for field in FIELDNAMES])
+                        else:
+                            raw = self._encode_row(list(item_to_row(key, item).values()))
+                        locators[key] = offset
+                        offset += file.write(raw)
+                    sync_file(file)
+            finally:
+                if source is not None:
+                    source.close()
+
+            with self._lock:
+                replace_file(tmp_path, self.track_csv)
+                self._csv_stamp = csv_stamp(os.stat(self.track_csv))
+                stamp = self._csv_stamp
+                self._fieldnames = FIELDNAMES
+                if isinstance(library, LazyTrackMap):
+                    library.relocate(locators)
+
+            if columns is not None and self.use_snapshot:
+                self._write_snapshot(columns, stamp)
+            self._trim_journal(covered)
+    def write_changes(self, changes, library):
+        if not self.use_journal:
+            self.save_all(library)
+            return
+
+        with self._lock:
+            if self._journal is None:
+                self._journal = open(self.journal_file, mode="a", encoding="utf-8")
+            for op, key, fields in changes:
+                item = library.get(key)
+                if op == "put" and item is not None:
+                    entry = {"op": "put", "id": key, "row": item_to_row(key, item)}
+                elif op == "set":
+                    entry = {"op": "set", "id": key, "fields": fields}
+                else:
+                    entry = {"op": "remove", "id": key}
+                self._journal.write(json.dumps(entry) + "\n")
+            self._journal.flush()
+            self._journal_entries += len(changes)
+            due = self._journal_entries >= self.compact_threshold and not self._compacting
+
+        if due:
+            self.compact(library, background=True)
+    def compact(self, library, background=False):
+        with self._lock:
+            if self._compacting:
+                return
+            self._compacting = True
+
+        def run():
+            try:
+                self.save_all(library)
+            finally:
+                self._compacting = False
+
+        if background:
+            threading.Thread(target=run, daemon=True).start()
+        else:
+            run()
+    def close(self):
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+        # A short run (e.g. one CLI command) would otherwise exit in the middle of the write
+        if self._snapshot_thread is not None:
+            self._snapshot_thread.join()
+            self._snapshot_thread = None
+
+    def iter_rows(self, library):
+        if not isinstance(library, LazyTrackMap):
+            yield from super().iter_rows(library)
+            return
+
+        # Stream rows straight from the file; items already read win since they may
+        # hold changes that are not saved yet. The file is opened under the lock that
+        # save_all replaces it under, so the open file always matches the locators and
+        # header of the snapshot, even if a save swaps in a new file while this runs.
+        with self.library_lock, self._lock:
+            entries = library.snapshot()
+            fieldnames = self._fieldnames
+            file = open(self.track_csv, mode="rb")
+        with file:
+            for key, item, locator in entries:
+                if item is None:
+                    yield normalize_row(self._parse_record(self._read_record(file, locator), fieldnames))
+                else:
+                    yield normalize_row(item_to_row(key, item))
+
+    def _read_csv(self):
+        library, self._csv_stamp = self._parse_csv()
+        return library
+    def _parse_csv(self):
+        library = TrackColumnMap()
+        stamp = None
+        if os.path.exists(self.track_csv):
+            with open(self.track_csv, mode="r", encoding="utf-8") as file:
+                stamp = csv_stamp(os.fstat(file.fileno()))
+                reader = csv.DictReader(file)
+                for row in reader:
+                    row = normalize_row(row)
+                    library.append_row(row["track_id"], row["name"], row["artist"], row["rating"],
+                                       row["plays"], row["album"], row["year"])
+        return library, stamp
+    def _index_csv(self):
+        locators = {}
+        if os.path.exists(self.track_csv):
+            with open(self.track_csv, mode="rb") as file:
+                self._csv_stamp = csv_stamp(os.fstat(file.fileno()))
+                header = self._read_record(file, 0)
+                if not header:
+                    return LazyTrackMap(locators, self._fetch)
+                self._fieldnames = next(csv.reader([header.decode("utf-8")]))
+                id_column = self._fieldnames.index("track_id")
+                offset = len(header)
+                while True:
+                    raw = self._read_record(file, offset)
+                    if not raw:
+                        break
+                    if raw.strip():
+                        if id_column == 0 and not raw.startswith(b'"'):
+                            key = raw.split(b",", 1)[0].decode("utf-8")
+                        else:
+                            key = self._parse_record(raw)["track_id"]
+                        locators[key] = offset
+                    offset += len(raw)
+        return LazyTrackMap(locators, self._fetch)
+    def _fetch(self, key, locator):
+        with self._lock:
+            with open(self.track_csv, mode="rb") as file:
+                raw = self._read_record(file, locator)
+        return row_to_item(self._parse_record(raw))
+    def _parse_record(self, raw, fieldnames=None):
+        values = next(csv.reader(io.StringIO(raw.decode("utf-8"))))
+        return dict(zip(fieldnames or self._fieldnames, values))
+    @staticmethod
+    def _read_record(file, offset):
+        file.seek(offset)
+        raw = file.readline()
+        while raw.count(b'"') % 2:  # a quoted field runs onto the next line
+            more = file.readline()
+            if not more:
+                break
+            raw += more
+        return raw
+    @staticmethod
+    def _encode_row(values):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(values)
+        return buffer.getvalue().encode("utf-8")
+
+    def _sweep_snapshot_files(self):
+        # Temp files of snapshot writes cut short by a crash; ones younger than a
+        # minute may belong to another library still writing them
+        folder = os.path.dirname(os.path.abspath(self.snapshot_file))
+        prefix = os.path.basename(self.snapshot_file) + "."
+        try:
+            names = os.listdir(folder)
+        except OSError:
+            return
+        cutoff = time.time() - 60
+        for name in names:
+            if name.startswith(prefix) and name.endswith(".tmp"):
+                path = os.path.join(folder, name)
+                try:
+                    if os.stat(path).st_mtime < cutoff:
+                        os.remove(path)
+                except OSError:
+                    pass  # gone already, or in use
+    def _read_snapshot(self):
+        if not self.use_snapshot or not os.path.exists(self.track_csv):
+            return None
+        stamp = csv_stamp(os.stat(self.track_csv))
+        library = read_snapshot(self.snapshot_file, stamp)
+        if library is not None:
+            self._csv_stamp = stamp
+        return library
+    def _rebuild_snapshot(self, library):
+        # After a load from the CSV; on a thread so startup does not wait for it.
+        # A lazily loaded library has not parsed its rows, so the thread reads the CSV.
+        if not self.use_snapshot or self._csv_stamp is None:
+            return
+        columns = library.copy() if isinstance(library, TrackColumnMap) else None
+        self._snapshot_thread = threading.Thread(target=self._write_snapshot, args=(columns, self._csv_stamp),
+                                                 name="snapshot", daemon=True)
+        self._snapshot_thread.start()
+    def _write_snapshot(self, columns, stamp):
+        tmp_path = None
+        try:
+            with self._snapshot_lock:
+                if columns is None:
+                    columns, stamp = self._parse_csv()
+                if stamp != self._csv_stamp:
+                    # The CSV was rewritten since: a column save writes its own
+                    # snapshot, otherwise the next load rebuilds it
+                    return
+                # Own temp name: another process may be writing the same snapshot
+                handle, tmp_path = tempfile.mkstemp(".tmp", os.path.basename(self.snapshot_file) + ".",
+                                                    os.path.dirname(os.path.abspath(self.snapshot_file)))
+                with open(handle, mode="wb") as file:
+                    written = write_snapshot(file, columns, stamp)
+                    sync_file(file)
+                if written:
+                    replace_file(tmp_path, self.snapshot_file)
+                    tmp_path = None
+        except (OSError, ValueError) as e:
+            print(f"Snapshot write failed: {e}")  # only startup time is lost, the CSV is intact
+        finally:
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _replay_journal(self, library):
+        if not os.path.exists(self.journal_file):
+            return False
+
+        replayed = False
+        with open(self.journal_file, mode="r", encoding="utf-8") as file:
+            for line in file:
+                self._journal_entries += 1
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # skip a line torn by a crash mid-append
+                key = entry["id"]
+                if entry["op"] == "put":
+                    library[key] = row_to_item(entry["row"])
+                elif entry["op"] == "remove":
+                    library.pop(key, None)
+                elif entry["op"] == "set" and key in library:
+                    item = library[key]
+                    if "plays" in entry["fields"]:
+                        item.play_count = entry["fields"]["plays"]
+                    if "rating" in entry["fields"]:
+                        item.rating = entry["fields"]["rating"]
+                replayed = True
+        return replayed
+    def _trim_journal(self, covered):
+        # Drop the first `covered` entries, which the CSV just written already contains.
+        # Entries appended while the CSV was being written are kept for the next compaction.
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            if not os.path.exists(self.journal_file):
+                self._journal_entries = 0
+                return
+
+            with open(self.journal_file, mode="r", encoding="utf-8") as file:
+                remaining = file.readlines()[covered:]
+            if remaining:
+                tmp_path = self.journal_file + ".tmp"
+                with open(tmp_path, mode="w", encoding="utf-8") as file:
+                    file.writelines(remaining)
+                    sync_file(file)
+                replace_file(tmp_path, self.journal_file)
+            else:
+                os.remove(self.journal_file)
+            self._journal_entries = len(remaining)
+
+class SqliteTrackStorage(TrackStorage):
+    SCHEMA = [
+        # seq keeps the CSV's insertion order for get_keys()
+        """CREATE TABLE IF NOT EXISTS tracks (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            track_id TEXT NOT NULL UNIQUE,
+            name TEXT NOT NULL,
+            artist TEXT NOT NULL,
+            rating INTEGER NOT NULL,
+            plays INTEGER NOT NULL,
+            album TEXT NOT NULL DEFAULT '',
+            year INTEGER
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_tracks_artist ON tracks(artist COLLATE NOCASE)",
+        "CREATE INDEX IF NOT EXISTS idx_tracks_rating ON tracks(rating)",
+        "CREATE INDEX IF NOT EXISTS idx_tracks_plays ON tracks(plays)",
+        "CREATE INDEX IF NOT EXISTS idx_tracks_album ON tracks(album)",
+    ]
+    FTS_SCHEMA = [
+        """CREATE VIRTUAL TABLE IF NOT EXISTS tracks_fts USING fts5(
+            name, artist, content='tracks', content_rowid='seq', tokenize='trigram'
+        )""",
+        """CREATE TRIGGER IF NOT EXISTS tracks_fts_ai AFTER INSERT ON tracks BEGIN
+            INSERT INTO tracks_fts(rowid, name, artist) VALUES (new.seq, new.name, new.artist);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS tracks_fts_ad AFTER DELETE ON tracks BEGIN
+            INSERT INTO tracks_fts(tracks_fts, rowid, name, artist) VALUES ('delete', old.seq, old.name, old.artist);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS tracks_fts_au AFTER UPDATE OF name, artist ON tracks BEGIN
+            INSERT INTO tracks_fts(tracks_fts, rowid, name, artist) VALUES ('delete', old.seq, old.name, old.artist);
+            INSERT INTO tracks_fts(rowid, name, artist) VALUES (new.seq, new.name, new.artist);
+        END""",
+    ]
+    UPSERT = """INSERT INTO tracks (track_id, name, artist, rating, plays, album, year)
+        VALUES (:track_id, :name, :artist, :rating, :plays, :album, :year)
+        ON CONFLICT(track_id) DO UPDATE SET name = excluded.name, artist = excluded.artist,
+            rating = excluded.rating, plays = excluded.plays, album = excluded.album, year = excluded.year"""
+    indexed_queries = True
+
+    def __init__(self, db_path="tracks.db", import_csv=None):
+        self.db_path = db_path
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+
+        with self.conn:
+            for statement in self.SCHEMA:
+                self.conn.execute(statement)
+            try:
+                for statement in self.FTS_SCHEMA:
+                    self.conn.execute(statement)
+                self.has_fts = True
+            except sqlite3.OperationalError:
+                self.has_fts = False  # SQLite built without FTS5, search uses LIKE
+
+        # Seed a new database from the CSV so switching backends keeps the library
+        empty = self.conn.execute("SELECT 1 FROM tracks LIMIT 1").fetchone() is None
+        if empty and import_csv and os.path.exists(import_csv):
+            with open(import_csv, mode="r", encoding="utf-8") as file:
+                rows = [item_to_row(row["track_id"], row_to_item(row)) for row in csv.DictReader(file)]
+            with self.conn:
+                self.conn.executemany(self.UPSERT, [self._db_row(row) for row in rows])
+
+    def load(self):
+        with self._lock:
+            keys = [row[0] for row in self.conn.execute("SELECT track_id FROM tracks ORDER BY seq")]
+        return LazyTrackMap(dict.fromkeys(keys), self._fetch)
+    def save_all(self, library):
+        with self.library_lock:
+            rows = [self._db_row(item_to_row(key, item)) for key, item in library.items()]
+        with self._lock, self.conn:
+            stored = {row[0] for row in self.conn.execute("SELECT track_id FROM tracks")}
+            self.conn.executemany("DELETE FROM tracks WHERE track_id = ?",
+                                  [(key,) for key in stored.difference(row["track_id"] for row in rows)])
+            self.conn.executemany(self.UPSERT, rows)
+    def write_changes(self, changes, library):
+        with self._lock, self.conn:
+            for op, key, fields in changes:
+                item = library.get(key)
+                if op == "put" and item is not None:
+                    self.conn.execute(self.UPSERT, self._db_row(item_to_row(key, item)))
+                elif op == "set":
+                    columns = ", ".join(f"{field} = :{field}" for field in fields)
+                    self.conn.execute(f"UPDATE tracks SET {columns} WHERE track_id = :track_id",
+                                      dict(fields, track_id=key))
+                else:
+                    self.conn.execute("DELETE FROM tracks WHERE track_id = ?", (key,))
+    def close(self):
+        with self._lock:
+            self.conn.close()
+    def iter_rows(self, library, batch_size=1000):
+        # Keyset pagination so the connection lock is never held across a yield
+        last_seq = 0
+        while True:
+            with self._lock:
+                rows = self.conn.execute("SELECT * FROM tracks WHERE seq > ? ORDER BY seq LIMIT ?",
+                                         (last_seq, batch_size)).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                key = row["track_id"]
+                item = library.loaded(key) if isinstance(library, LazyTrackMap) else None
+                if key not in library:
+                    continue
+                yield normalize_row(item_to_row(key, item) if item is not None else dict(row))
+            last_seq = rows[-1]["seq"]
+
+    def search(self, query):
+        if self.has_fts and len(query) >= 3:
+            phrase = '"' + query.replace('"', '""') + '"'
+            return self._keys("""SELECT t.track_id FROM tracks_fts f JOIN tracks t ON t.seq = f.rowid
+                WHERE tracks_fts MATCH ? ORDER BY t.seq""", (phrase,))
+        pattern = "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        return self._keys("""SELECT track_id FROM tracks
+            WHERE name LIKE ? ESCAPE '\\' OR artist LIKE ? ESCAPE '\\' ORDER BY seq""", (pattern, pattern))
+    def find_by_artist(self, artist):
+        return self._keys("SELECT track_id FROM tracks WHERE artist = ? COLLATE NOCASE ORDER BY seq", (artist,))
+    def find_by_rating(self, rating):
+        return self._keys("SELECT track_id FROM tracks WHERE rating = ? ORDER BY seq", (rating,))
+    def find_by_play_range(self, low, high=None):
+        if high is None:
+            return self._keys("SELECT track_id FROM tracks WHERE plays >= ? ORDER BY seq", (low,))
+        return self._keys("SELECT track_id FROM tracks WHERE plays BETWEEN ? AND ? ORDER BY seq", (low, high))
+    def get_artists(self):
+        return self._keys("SELECT DISTINCT artist FROM tracks ORDER BY artist")
+
+    def _keys(self, sql, params=()):
+        with self._lock:
+            return [row[0] for row in self.conn.execute(sql, params)]
+    def _fetch(self, key, locator=None):
+        with self._lock:
+            row = self.conn.execute("SELECT * FROM tracks WHERE track_id = ?", (key,)).fetchone()
+        if row is None:
+            raise KeyError(key)
+        return row_to_item(dict(row))
+    @staticmethod
+    def _db_row(row):
+        row = dict(row)
+        row["year"] = row["year"] or None
+        return row
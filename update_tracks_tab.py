@@ -1,8 +1,9 @@
 #update_tracks_tab.py
 import tkinter as tk
 from tkinter import filedialog, ttk, Canvas
-import shutil
-from library_item import LibraryItemAlbum
+from track_library import ChangeTracker
+from track_query import FILTER_TYPES, Query, Text, filter_choices, filter_condition
+import metrics
 
 class UpdateTracksTab(ttk.Frame):
     def __init__(self, master, lib):
@@ -10,6 +11,9 @@ class UpdateTracksTab(ttk.Frame):
         self.lib = lib
         self.selected_image_path = None
         self.selected_audio_path = None
+        self.rows = {}
+        self.showing_all = False
+        self.changes = ChangeTracker(lib)
 
         self.build_update_tab()
         self.view_all()
@@ -56,7 +60,7 @@ class UpdateTracksTab(ttk.Frame):
 
         tk.Label(top_controls, text="Filter by:").pack(side="left", padx=(20, 5))
         self.filter_type = ttk.Combobox(top_controls, width=12, state="readonly")
-        self.filter_type['values'] = ["Artist", "Rating", "Play Count"]
+        self.filter_type['values'] = FILTER_TYPES
         self.filter_type.pack(side="left")
         self.filter_type.bind("<<ComboboxSelected>>", self.update_filter_values)
 
@@ -95,17 +99,17 @@ class UpdateTracksTab(ttk.Frame):
         self.selected_audio_path = None
     def delete_track(self):
         track_id = self.editor_entries["track id"].get().strip().zfill(2)
-        if track_id not in self.lib.get_keys():
+        if not self.lib.has_track(track_id):
             self.status_label.configure(text="Track ID not found.")
             return
 
         self.lib.remove_track(track_id)
         self.status_label.configure(text=f"Track {track_id} deleted.")
         self.clear_editor_fields()
-        self.view_all()
+        self.refresh()
     def update_track_info(self):
         track_id = self.editor_entries["track id"].get().strip().zfill(2)
-        if track_id not in self.lib.get_keys():
+        if not self.lib.has_track(track_id):
             self.status_label.configure(text="Track ID not found.")
             return
 
@@ -115,47 +119,24 @@ class UpdateTracksTab(ttk.Frame):
         album = self.editor_entries["album"].get().strip()
         year = self.editor_entries["year"].get().strip()
 
-        item = self.lib.get_item(track_id)
-        if name:
-            item.name = name
-        if artist:
-            item.artist = artist
+        rating_val = None
         if rating.isdigit():
             rating_val = int(rating)
-            if 0 <= rating_val <= 5:
-                item.rating = rating_val
-            else:
+            if not 0 <= rating_val <= 5:
                 self.status_label.configure(text="Rating must be between 0 and 5.")
                 return
         elif rating:
             self.status_label.configure(text="Invalid rating input.")
             return
 
-        needs_album = bool(album)
-        needs_year = year.isdigit()
-        if not isinstance(item, LibraryItemAlbum) and (needs_album or needs_year):
-            new_album = album if needs_album else ""
-            new_year = int(year) if needs_year else 0
-            new_item = LibraryItemAlbum(item.name, item.artist, item.rating, new_album, new_year)
-            new_item.play_count = item.play_count
-            self.lib.library[track_id] = new_item
-            item = new_item
-
-        if album:
-            item.album = album
-        if year.isdigit():
-            item.year = int(year)
-
-        self.lib.save_library_to_csv()
+        year_val = int(year) if year.isdigit() else None
+        self.lib.update_track(track_id, name, artist, rating_val, album, year_val)
 
-        if self.selected_image_path:
-            shutil.copy(self.selected_image_path, f"track_images/{track_id}.jpg")
-        if self.selected_audio_path:
-            shutil.copy(self.selected_audio_path, f"track_sounds/{track_id}.mp3")
+        self.lib.set_media(track_id, self.selected_image_path, self.selected_audio_path)
 
         self.status_label.configure(text="Track updated successfully.")
         self.clear_editor_fields()
-        self.view_all()
+        self.refresh()
     def add_track(self):
         track_id = self.editor_entries["track id"].get().strip().zfill(2)
         name = self.editor_entries["name"].get().strip()
@@ -168,7 +149,7 @@ class UpdateTracksTab(ttk.Frame):
             self.status_label.configure(text="Missing or invalid input.")
             return
 
-        if track_id in self.lib.get_keys():
+        if self.lib.has_track(track_id):
             self.status_label.configure(text="Track ID already exists.")
             return
 
@@ -183,65 +164,59 @@ class UpdateTracksTab(ttk.Frame):
         )
         self.status_label.configure(text=msg)
         self.clear_editor_fields()
-        self.view_all()
+        self.refresh()
     def search_clicked(self):
-        query = self.search_entry.get().strip().lower()
-        result_keys = [
-            key for key in self.lib.get_keys()
-            if query in self.lib.get_name(key).lower() or query in self.lib.get_artist(key).lower()
-        ]
+        result_keys = self.lib.query(Query(Text(self.search_entry.get())))
         self.display_tracks_by_keys(result_keys)
     def update_filter_values(self, event=None):
-        choice = self.filter_type.get()
-        if choice == "Artist":
-            values = sorted(set(self.lib.get_artist(k) for k in self.lib.get_keys()))
-        elif choice == "Rating":
-            values = [str(i) for i in range(6)]
-        elif choice == "Play Count":
-            values = ["0-10", "11-20", "21-50", "51+"]
-        else:
-            values = []
-        self.filter_value['values'] = values
+        self.filter_value['values'] = filter_choices(self.lib, self.filter_type.get())
         self.filter_value.set("")
     def apply_filter(self):
-        filter_type = self.filter_type.get()
-        filter_value = self.filter_value.get().strip()
-        base_keys = self.lib.get_keys()
-        result_keys = []
-
-        for key in base_keys:
-            if filter_type == "Artist" and self.lib.get_artist(key).lower() == filter_value.lower():
-                result_keys.append(key)
-            elif filter_type == "Rating" and str(self.lib.get_rating(key)) == filter_value:
-                result_keys.append(key)
-            elif filter_type == "Play Count":
-                count = self.lib.get_play_count(key)
-                if (filter_value == "0-10" and count <= 10 or
-                        filter_value == "11-20" and 11 <= count <= 20 or
-                        filter_value == "21-50" and 21 <= count <= 50 or
-                        filter_value == "51+" and count >= 51):
-                    result_keys.append(key)
-
+        condition = filter_condition(self.filter_type.get(), self.filter_value.get())
+        result_keys = [] if condition is None else self.lib.query(Query(condition))
         self.display_tracks_by_keys(result_keys)
     def view_all(self):
         self.display_tracks_by_keys(self.lib.get_keys())
+        self.showing_all = True
     def display_tracks_by_keys(self, keys):
-        for widget in self.scrollable_frame.winfo_children():
-            widget.destroy()
-
-        for key in keys:
-            name = self.lib.get_name(key)
-            artist = self.lib.get_artist(key)
-            rating = self.lib.get_rating(key)
-            stars = '*' * rating
-            plays = self.lib.get_play_count(key)
-
-            frame = ttk.Frame(self.scrollable_frame, relief="solid", borderwidth=1)
-            frame.pack(fill="x", padx=5, pady=3)
-
-            info = f"Track {key}: {name}\nArtist: {artist}\nRating: {stars}\nPlays: {plays}"
-            tk.Label(frame, text=info, justify="left").pack(side="left", padx=10)
+        with metrics.timer("update.render"):
+            for widget in self.scrollable_frame.winfo_children():
+                widget.destroy()
+            self.rows = {}
+            self.showing_all = False
+
+            for key in keys:
+                self.add_row(key)
+    def add_row(self, key):
+        frame = ttk.Frame(self.scrollable_frame, relief="solid", borderwidth=1)
+        frame.pack(fill="x", padx=5, pady=3)
+
+        label = tk.Label(frame, text=self.row_text(key), justify="left")
+        label.pack(side="left", padx=10)
+        self.rows[key] = (frame, label)
+    def row_text(self, key):
+        name = self.lib.get_name(key)
+        artist = self.lib.get_artist(key)
+        rating = self.lib.get_rating(key)
+        stars = '*' * rating
+        plays = self.lib.get_play_count(key)
+        return f"Track {key}: {name}\nArtist: {artist}\nRating: {stars}\nPlays: {plays}"
     def _on_mousewheel(self, event):
         self.canvas.yview_scroll(int(-1*(event.delta/120)), "units")
     def refresh(self):
-        self.view_all()
\ No newline at end of file
+        if not self.changes.changed():
+            return
+        updated, structural, reloaded = self.changes.take()
+        if reloaded or not self.showing_all:
+            self.view_all()
+            return
+
+        # Patch only the rows of tracks that changed
+        for key in structural:
+            if key in self.rows and not self.lib.has_track(key):
+                self.rows.pop(key)[0].destroy()
+            elif key not in self.rows and self.lib.has_track(key):
+                self.add_row(key)
+        for key in updated:
+            if key in self.rows:
+                self.rows[key][1].config(text=self.row_text(key))
@@ -1,13 +1,43 @@
 import tkinter as tk                     # Import the base tkinter module for GUI
 from tkinter import ttk, Canvas          # Import themed widgets and Canvas from tkinter
-from PIL import Image, ImageTk           # Import PIL for image loading and resizing
-import os                                # OS module for checking file paths
+from thumbnail_cache import ThumbnailCache  # Cached 100x100 cover thumbnails
+from concurrent.futures import ThreadPoolExecutor  # Worker threads for decoding covers
+import queue                             # Thread-safe hand-off of decoded covers to the Tk thread
+from track_library import ChangeTracker  # Library change events, so refresh patches rows instead of rebuilding
+from track_query import FILTER_TYPES, All, Ids, Query, Text, filter_choices, filter_condition  # Shared query engine
+import metrics                           # Opt-in timers; no-ops unless enabled
+
+ROW_HEIGHT = 124                         # Fixed height of one track row in pixels (100px cover plus padding)
+OVERSCAN = 3                             # Rows kept rendered above and below the visible area
+PAGE_SIZE = 100                          # Tracks per page in sorted views
+SORT_OPTIONS = {                         # Sort dropdown label -> (field, descending), None keeps library order
+    "Library order": None,
+    "Most played": ("plays", True),
+    "Least played": ("plays", False),
+    "Highest rated": ("rating", True),
+    "Newest": ("year", True),
+    "Oldest": ("year", False),
+    "Name A-Z": ("name", False),
+}
+
 # Define the ViewTracksTab class which inherits from ttk.Frame
 class ViewTracksTab(ttk.Frame):
     def __init__(self, master, lib):
         super().__init__(master)         # Call parent constructor
         self.lib = lib                   # Reference to the track library passed in
-        self.last_displayed_keys = []    # Store last viewed track keys for filtering context
+        self.current_condition = None    # Query behind the current view (None = everything), for narrowing and refresh
+        self.display_keys = []           # Keys of the current result set, in display order
+        self.showing_all = False         # True while the whole library is displayed (not a search or filter)
+        self.page = 0                    # Page of a sorted view, PAGE_SIZE tracks each
+        self.changes = ChangeTracker(lib)  # Collects library changes between refreshes
+        self.row_pool = []               # Recycled row widgets, only enough to cover the viewport
+        self.thumbnails = ThumbnailCache(master=self)  # Covers are decoded once, then served from memory or disk
+        self.placeholder = tk.PhotoImage(master=self, width=100, height=100)  # Shown until a cover is decoded
+        self.image_pool = ThreadPoolExecutor(max_workers=4)  # Decodes covers off the Tk thread
+        self.image_results = queue.Queue()  # (generation, row, key, thumbnail path) from the workers
+        self.image_jobs = []             # Futures for the current result set, cancelled when it changes
+        self.render_generation = 0       # Bumped for every new result set so late results are dropped
+        self.draining_images = False     # Whether _drain_image_results is scheduled with after()
         self.build_view_tab()            # Build the GUI layout
         self.view_all()                  # Show all tracks initially
 
@@ -31,26 +61,37 @@ class ViewTracksTab(ttk.Frame):
         # Filter section
         tk.Label(self.view_top, text="Filter by:").pack(side="left", padx=(20, 5))         # Label for filter type
         self.filter_type = ttk.Combobox(self.view_top, width=12, state="readonly")         # Dropdown for filter types
-        self.filter_type['values'] = ["Artist", "Rating", "Play Count"]                    # Set filter options
+        self.filter_type['values'] = FILTER_TYPES                                          # Set filter options
         self.filter_type.pack(side="left", padx=5)
         self.filter_type.bind("<<ComboboxSelected>>", self.update_filter_values)           # When selected, update values
 
         self.filter_value = ttk.Combobox(self.view_top, width=20, state="readonly")        # Dropdown for filter values
         self.filter_value.pack(side="left", padx=5)
         tk.Button(self.view_top, text="Apply Filter", bg="#fff9c4", command=self.apply_filter).pack(side="left")  # Apply button
-
-        # Create a scrollable canvas area for track display
+        self.narrow_results = tk.BooleanVar(value=True)                                    # Filter within the current results
+        tk.Checkbutton(self.view_top, text="Within results", variable=self.narrow_results).pack(side="left", padx=5)
+
+        # Sort and paging controls on a second line
+        self.view_sort = tk.Frame(self)
+        self.view_sort.pack(fill="x", padx=10, pady=(0, 5))
+        tk.Label(self.view_sort, text="Sort by:").pack(side="left")
+        self.sort_type = ttk.Combobox(self.view_sort, width=14, state="readonly", values=list(SORT_OPTIONS))
+        self.sort_type.set("Library order")
+        self.sort_type.pack(side="left", padx=5)
+        self.sort_type.bind("<<ComboboxSelected>>", self.sort_changed)                    # Re-show the current view sorted
+        tk.Button(self.view_sort, text="< Prev", command=lambda: self.change_page(-1)).pack(side="left", padx=(20, 5))
+        self.page_label = tk.Label(self.view_sort, text="")                                # "Page 2 of 7" in sorted views
+        self.page_label.pack(side="left")
+        tk.Button(self.view_sort, text="Next >", command=lambda: self.change_page(1)).pack(side="left", padx=5)
+
+        # Create a virtualized canvas: only the rows inside the viewport exist as widgets,
+        # and they are moved and refilled as the user scrolls
         self.canvas = Canvas(self)
         self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.canvas.yview)
-        self.scrollable_frame = ttk.Frame(self.canvas)
+        self.canvas.configure(yscrollcommand=self._on_canvas_scroll)   # Re-render rows whenever the view moves
+        self.canvas.bind("<Configure>", self._on_canvas_resize)         # Stretch rows and grow the pool on resize
 
-        # Resize canvas when internal frame size changes
-        self.scrollable_frame.bind(
-            "<Configure>", lambda e: self.canvas.configure(scrollregion=self.canvas.bbox("all"))
-        )
-
-        self.canvas.create_window((0, 0), window=self.scrollable_frame, anchor="nw")       # Add scrollable frame to canvas
-        self.canvas.configure(yscrollcommand=self.scrollbar.set)
+        self.empty_text = self.canvas.create_text(20, 20, anchor="nw", text="No tracks found.", state="hidden")
 
         self.canvas.pack(side="left", fill="both", expand=True)                            # Expand canvas
         self.scrollbar.pack(side="right", fill="y")                                        # Pack scrollbar on right
@@ -64,131 +105,235 @@ class ViewTracksTab(ttk.Frame):
         self.canvas.bind_all("<Button-5>", lambda e: self.canvas.yview_scroll(1, "units"))   # Scroll down
 
     def view_all(self):
-        self.clear_scrollable_frame()                      # Clear current display
-        keys = self.lib.get_keys()                         # Get all track keys
-        for key in keys:
-            self.display_track(key)                        # Display each track
-        self.last_displayed_keys = keys                    # Store displayed keys for filtering
+        self.current_condition = None                      # Nothing to narrow by any more
+        self.page = 0
+        if self.sorted_by() is not None:
+            self.show_page()                               # First page of the whole library, sorted
+            return
+        self.display_tracks_by_keys(self.lib.get_keys())   # Display every track in library order
+        self.showing_all = True                            # Later changes can be patched into this view
+
+    def show_query(self, condition):
+        result_keys = self.lib.query(Query(condition))     # Planned against the indexes, cached until the library changes
+        if result_keys:
+            self.current_condition = condition             # An empty result keeps the previous context, as before
+        self.page = 0
+        if result_keys and self.sorted_by() is not None:
+            self.show_page()                               # First page of the results, sorted
+            return
+        self.display_tracks_by_keys(result_keys)
+
+    def sorted_by(self):
+        return SORT_OPTIONS[self.sort_type.get()]          # (field, descending) or None for library order
+
+    def show_page(self):
+        field, descending = self.sorted_by()
+        total = len(self.lib.query(Query(self.current_condition)))  # Cached, so paging does not re-run the filter
+        pages = max((total + PAGE_SIZE - 1) // PAGE_SIZE, 1)
+        self.page = min(self.page, pages - 1)              # The view may have shrunk since the last page was shown
+        # Only this page is selected: maintained orderings for plays and rating, heap selection otherwise
+        keys = self.lib.query(Query(self.current_condition, field, descending, PAGE_SIZE, self.page * PAGE_SIZE))
+        self.display_tracks_by_keys(keys)
+        self.page_label.config(text=f"Page {self.page + 1} of {pages}")
+
+    def change_page(self, step):
+        if self.sorted_by() is None:
+            return                                         # Library order is one scrolling list
+        self.page = max(self.page + step, 0)               # show_page clamps the upper end
+        self.show_page()
+
+    def sort_changed(self, event=None):
+        if self.current_condition is None:
+            self.view_all()                                # Whole library in the new order
+        else:
+            self.show_query(self.current_condition)        # Same results in the new order
 
     def view_clicked(self):
         key = self.view_entry.get().strip().zfill(2)       # Get track ID, zero-padded
-        if self.lib.get_name(key):                         # Check if track exists
-            self.display_tracks_by_keys([key])             # Display single track
-        else:
-            self.display_tracks_by_keys([])                # Show "not found" message
+        self.show_query(Ids([key]))                        # Single track, or the "not found" message
 
     def search_clicked(self):
-        query = self.search_entry.get().strip().lower()    # Get and lower search input
-        result_keys = [
-            key for key in self.lib.get_keys()
-            if query in self.lib.get_name(key).lower() or query in self.lib.get_artist(key).lower()
-        ]                                                  # Filter by name or artist
-        self.display_tracks_by_keys(result_keys)           # Display matches
+        query = self.search_entry.get()                    # Get search input
+        if not query.strip():
+            self.view_all()                                # An empty search shows everything
+            return
+        self.show_query(Text(query))                       # Indexed name/artist match in the library
 
     def apply_filter(self):
-        filter_type = self.filter_type.get()               # Get selected filter type
-        filter_value = self.filter_value.get().strip()     # Get filter value
-
-        base_keys = self.last_displayed_keys if self.last_displayed_keys else self.lib.get_keys()
-        result_keys = []                                   # Track results
-
-        for key in base_keys:  # Loop through each track key from previously displayed or all tracks
-            if filter_type == "Artist" and self.lib.get_artist(key).lower() == filter_value.lower():
-                # If filtering by Artist and artist name matches (case-insensitive), add to result
-                result_keys.append(key)
-            elif filter_type == "Rating" and str(self.lib.get_rating(key)) == filter_value:
-                # If filtering by Rating and it matches the selected value, add to result
-                result_keys.append(key)
-            elif filter_type == "Play Count":  # If filtering by Play Count range
-                count = self.lib.get_play_count(key)  # Get the track's play count
-                if (filter_value == "0-10" and count <= 10 or
-                        filter_value == "11-20" and 11 <= count <= 20 or
-                        filter_value == "21-50" and 21 <= count <= 50 or
-                        filter_value == "51+" and count >= 51):
-                    # Check if count falls within selected range, then add to result
-                    result_keys.append(key)
-
-        self.display_tracks_by_keys(result_keys)  # Show all tracks that match the filter
+        condition = filter_condition(self.filter_type.get(), self.filter_value.get())  # e.g. Plays(11, 20)
+        if condition is None:
+            self.display_tracks_by_keys([])                # Nothing selected, nothing matches
+            return
+        if self.narrow_results.get() and self.current_condition is not None:
+            condition = All(self.current_condition, condition)  # Keep only tracks from the current view
+        self.show_query(condition)
 
     def update_filter_values(self, event=None):
-        choice = self.filter_type.get()                    # Get filter type
-        if choice == "Artist":
-            values = sorted(set(self.lib.get_artist(k) for k in self.lib.get_keys()))  # Unique artist list
-        elif choice == "Rating":
-            values = [str(i) for i in range(6)]            # Ratings 0–5
-        elif choice == "Play Count":
-            values = ["0-10", "11-20", "21-50", "51+"]     # Play count ranges
-        else:
-            values = []
+        values = filter_choices(self.lib, self.filter_type.get())  # Artists, ratings 0-5 or play-count ranges
         self.filter_value['values'] = values               # Set filter value options
         self.filter_value.set("")                          # Clear previous selection
 
-    def display_track(self, key):
+    def create_row(self):
+        frame = ttk.Frame(self.canvas, relief="solid", borderwidth=1)
+        # Create a bordered frame that will be reused for whichever track scrolls into its slot
+
+        info_label = tk.Label(frame, justify="left")       # Track details on the left
+        info_label.pack(side="left", padx=10)
+        image_label = tk.Label(frame)                      # Cover image on the right
+        image_label.pack(side="right", padx=10)
+
+        window = self.canvas.create_window(10, 0, window=frame, anchor="nw", height=ROW_HEIGHT - 10,
+                                           width=max(self.canvas.winfo_width() - 20, 1), state="hidden")
+        return {"frame": frame, "info": info_label, "image": image_label, "window": window, "key": None, "job": None}
+
+    def display_track(self, row, key):
         name = self.lib.get_name(key)                      # Get track name
         artist = self.lib.get_artist(key)                  # Get track artist
         rating = self.lib.get_rating(key)                  # Get track rating
         stars = '*' * rating                               # Visual stars
         plays = self.lib.get_play_count(key)               # Get track play count
 
-        frame = ttk.Frame(self.scrollable_frame, relief="solid", borderwidth=1)
-        # Create a bordered frame to hold the track's details inside the scrollable area
-
-        frame.pack(fill="x", padx=10, pady=5)
-        # Add the frame to the scrollable section with horizontal fill and padding
-
         # Display track info on the left
         info = f"Track {key}: {name}\nArtist: {artist}\nRating: {stars}\nPlays: {plays}"
-        # Format a string with track info: ID, name, artist, rating as stars, and play count
+        row["info"].config(text=info)
+        row["key"] = key
 
-        tk.Label(frame, text=info, justify="left").pack(side="left", padx=10)
-        # Create and pack a label on the left side of the frame to show the text info
+        if row["job"] is not None:
+            row["job"].cancel()                  # The row scrolled to another track before its cover was decoded
+            row["job"] = None
 
         try:
-            img_path = f"track_images/{key}.jpg"  # Construct the path to the image file for this track
-
-            if os.path.exists(img_path):
-                img = Image.open(img_path).resize((100, 100))  # Open and resize image to 100x100 pixels
-                photo = ImageTk.PhotoImage(img)  # Convert the image for tkinter
-                img_label = tk.Label(frame, image=photo)  # Create a label to show the image
-                img_label.image = photo  # Keep a reference to avoid garbage collection
-                img_label.pack(side="right", padx=10)  # Pack the image to the right side of the frame
-
-            else:
-                fallback_img = Image.open("track_images/no_image.jpg").resize((100, 100))
-                # If the track image doesn't exist, use a fallback image instead
-
-                fallback_photo = ImageTk.PhotoImage(fallback_img)  # Convert fallback image for tkinter
-                fallback_label = tk.Label(frame, image=fallback_photo)  # Create label with fallback image
-                fallback_label.image = fallback_photo  # Keep a reference to avoid garbage collection
-                fallback_label.pack(side="right", padx=10)  # Pack fallback image to right side
+            photo = self.thumbnails.cached(key)  # Memory or on-disk thumbnail, or the shared fallback
+            if photo is None:
+                photo = self.placeholder         # Show a blank square now and decode the cover in the background
+                row["job"] = self.image_pool.submit(self._decode_cover, self.render_generation, row, key)
+                self.image_jobs.append(row["job"])
+                self._schedule_image_drain()
+            row["image"].config(image=photo, text="")
+            row["image"].image = photo  # Keep a reference to avoid garbage collection
 
         except Exception as e:
-            tk.Label(frame, text="Error loading image").pack(side="right", padx=10)
+            row["image"].config(image="", text="Error loading image")
             # If loading image fails for any reason, show an error label instead
 
             print(e)  # Print the error to the console for debugging
 
-    def display_tracks_by_keys(self, keys):
-        self.clear_scrollable_frame()  # Clear the scrollable frame before displaying new content
-
-        if not keys:
-            tk.Label(self.scrollable_frame, text="No tracks found.").pack(pady=10)
-            # If the list of keys is empty, show a message saying no results found
-            return
-
-        for key in keys:
-            self.display_track(key)  # Display each track found in the list of keys
-
-        self.last_displayed_keys = keys  # Save the currently displayed keys for future filter context
+    def _decode_cover(self, generation, row, key):
+        # Runs on a worker thread: no Tk calls here, only file and PIL work
+        if generation != self.render_generation:
+            return                                         # The result set changed while this job was queued
+        try:
+            with metrics.timer("view.image_decode"):       # Only covers missing from the thumbnail cache get here
+                path = self.thumbnails.thumbnail_path(key)
+        except Exception as e:
+            print(e)
+            path = None
+        self.image_results.put((generation, row, key, path))
+
+    def _schedule_image_drain(self):
+        if not self.draining_images:
+            self.draining_images = True
+            self.after(20, self._drain_image_results)
+
+    def _drain_image_results(self):
+        # Back on the Tk thread: swap decoded covers into rows that still show the same track
+        while True:
+            try:
+                generation, row, key, path = self.image_results.get_nowait()
+            except queue.Empty:
+                break
+            if generation == self.render_generation and row["key"] == key:
+                photo = self.thumbnails.photo_for(key, path)
+                row["image"].config(image=photo, text="")
+                row["image"].image = photo
+
+        self.image_jobs = [job for job in self.image_jobs if not job.done()]
+        if self.image_jobs or not self.image_results.empty():
+            self.after(20, self._drain_image_results)      # Keep draining only while covers are in flight
+        else:
+            self.draining_images = False
 
-    def clear_scrollable_frame(self):
-        for widget in self.scrollable_frame.winfo_children():
-            widget.destroy()  # Remove (destroy) every widget currently inside the scrollable frame
+    def display_tracks_by_keys(self, keys):
+        self.render_generation += 1                        # Results still being decoded for the old set are now stale
+        for job in self.image_jobs:
+            job.cancel()                                   # Drop queued decodes that have not started yet
+        self.image_jobs = []
+
+        self.display_keys = list(keys)                     # The full result set; rows are only built for the visible part
+        self.showing_all = False                           # view_all() sets this back after calling us
+        self.page_label.config(text="")                    # show_page() fills this in for sorted views
+        for row in self.row_pool:
+            row["key"] = None                              # Force every pooled row to be refilled
+
+        # Show a message instead of rows when nothing matched
+        self.canvas.itemconfigure(self.empty_text, state="normal" if not keys else "hidden")
+        self.canvas.configure(scrollregion=(0, 0, self.canvas.winfo_width(), len(self.display_keys) * ROW_HEIGHT))
+        self.canvas.yview_moveto(0)                        # Start a new result set at the top
+        with metrics.timer("view.render"):                 # Time to lay out a new result set
+            self.render_visible_rows()
+
+    def render_visible_rows(self):
+        visible = max(self.canvas.winfo_height(), ROW_HEIGHT) // ROW_HEIGHT + 1
+        first = max(int(self.canvas.canvasy(0)) // ROW_HEIGHT - OVERSCAN, 0)
+        while len(self.row_pool) < visible + 2 * OVERSCAN:
+            self.row_pool.append(self.create_row())        # Grow the pool only when the window gets taller
+
+        # Each pooled row takes one slot of the window [first, first + pool size)
+        for slot, row in enumerate(self.row_pool):
+            index = first + slot
+            if index >= len(self.display_keys):
+                self.canvas.itemconfigure(row["window"], state="hidden")
+                row["key"] = None
+                continue
+            key = self.display_keys[index]
+            if row["key"] != key:
+                with metrics.timer("view.row_render"):
+                    self.display_track(row, key)           # Refill only rows that now show a different track
+            self.canvas.coords(row["window"], 10, index * ROW_HEIGHT + 5)
+            self.canvas.itemconfigure(row["window"], state="normal")
+
+    def _on_canvas_scroll(self, first, last):
+        self.scrollbar.set(first, last)                    # Keep the scrollbar in sync
+        self.render_visible_rows()                         # Move and refill rows for the new viewport
+
+    def _on_canvas_resize(self, event):
+        for row in self.row_pool:
+            self.canvas.itemconfigure(row["window"], width=max(event.width - 20, 1))  # Rows span the canvas width
+        self.canvas.configure(scrollregion=(0, 0, event.width, len(self.display_keys) * ROW_HEIGHT))
+        self.render_visible_rows()
 
     def _on_mousewheel(self, event):
         self.canvas.yview_scroll(int(-1 * (event.delta / 120)), "units")
         # Scroll the canvas vertically when the mouse wheel is used (Windows/macOS behavior)
 
     def refresh(self):
-        self.view_all()  # A refresh method that re-displays all tracks, used externally to refresh the tab
+        if not self.changes.changed():
+            return                                         # The library has not changed since the last refresh
+        updated, structural, reloaded = self.changes.take()
+
+        if not self.showing_all and self.sorted_by() is not None and not reloaded:
+            self.show_page()                               # Re-select the same page, values may have moved
+            return
+        if reloaded or self.current_condition is None and not self.showing_all:
+            self.view_all()                                # Nothing to re-run, show everything
+            return
+        if not self.showing_all:
+            self.show_query(self.current_condition)        # Re-run the search or filter against the changed library
+            return
 
+        if structural:
+            # Drop removed tracks and append added ones without losing the scroll position
+            self.display_keys = [key for key in self.display_keys if self.lib.has_track(key)]
+            shown = set(self.display_keys)
+            self.display_keys += [key for key in structural if self.lib.has_track(key) and key not in shown]
+            self.canvas.itemconfigure(self.empty_text, state="normal" if not self.display_keys else "hidden")
+            self.canvas.configure(scrollregion=(0, 0, self.canvas.winfo_width(), len(self.display_keys) * ROW_HEIGHT))
+
+        for row in self.row_pool:
+            if row["key"] in updated or row["key"] in structural:
+                row["key"] = None                          # Only rows showing a changed track are refilled
+        self.render_visible_rows()
+
+    def destroy(self):
+        self.image_pool.shutdown(wait=False, cancel_futures=True)  # Stop decoding covers when the tab goes away
+        super().destroy()